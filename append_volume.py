@@ -1,80 +1,115 @@
-import sys
+"""
+Executes every build123d example in a directory and writes a copy of each with
+its volume appended as a "# Volume: ... mm^3" comment.
+
+Examples are run by the shared engine (engine.py), --jobs at a time (default:
+CPU count), with the executor chosen by --executor: a new interpreter per file
+(subprocess), warm worker processes (pool), this process (inline), or threads
+of this process (thread). Each annotated copy is written as soon as its example
+completes:
+
+    python append_volume.py examples examples_executed --jobs 8 --executor pool
+
+main2.py does the same with caching, a results database, more properties and
+post-processors.
+"""
+import argparse
 import os
-import shutil
-import subprocess
+import sys
+
+from engine import EXECUTORS, Engine
+from post_processors import annotated_source
 
-def process_python_files(input_dir, output_dir):
+def process_python_files(input_dir, output_dir, jobs=None, executor="subprocess"):
     """
-    Processes Python files in the input directory, performs actions as described,
-    and saves modified files to the output directory.
+    Executes every Python file in the input directory and writes a copy of each, with its
+    volume appended as a comment, to the output directory.
+
+    Every file is executed once by the shared engine; its annotated copy is written and
+    its log messages are printed as soon as it completes.
 
     Args:
         input_dir (str): Path to the input directory.
         output_dir (str): Path to the output directory.
+        jobs (int): Number of files to process concurrently (default: CPU count).
+        executor (str): How files are executed, one of engine.EXECUTORS (default: subprocess).
     """
 
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
 
-    for filename in os.listdir(input_dir):
-        if filename.endswith(".py") and os.path.isfile(os.path.join(input_dir, filename)):
-            input_filepath = os.path.join(input_dir, filename)
-            filename_stem, filename_ext = os.path.splitext(filename)
-            output_filepath_temp = os.path.join(output_dir, filename_stem + "_temp" + filename_ext)
-            output_filepath_original = os.path.join(output_dir, filename)
-
-            try:
-                # 1. Copy to output directory with "_temp"
-                shutil.copy2(input_filepath, output_filepath_temp)
-                print(f"Copied '{filename}' to '{output_filepath_temp}'")
-
-                # 2. Copy to output directory with original name
-                shutil.copy2(input_filepath, output_filepath_original)
-                print(f"Copied '{filename}' to '{output_filepath_original}'")
-
-                # 3. Append print(part.volume) to _temp file and run
-                with open(output_filepath_temp, "a") as temp_file:
-                    temp_file.write("\nprint(part.volume)\n")
-
-                try:
-                    # Execute the _temp file and capture output
-                    process = subprocess.run(
-                        [sys.executable, output_filepath_temp], # Use sys.executable to ensure we use the same python
-                        capture_output=True,
-                        text=True,
-                        check=True # Raise exception for non-zero exit codes
-                    )
-                    captured_output = process.stdout.strip()
-                    print(f"Executed '{output_filepath_temp}' and captured output: '{captured_output}'")
-
-                except subprocess.CalledProcessError as e:
-                    print(f"Error executing '{output_filepath_temp}': {e}")
-                    captured_output = "Error during execution" # Or handle error as needed
-
-                # 4. Modify the original file in output directory
-                with open(output_filepath_original, "a") as original_file:
-                    original_file.write(f"\n# Volume: {captured_output} mm^3\n")
-                print(f"Modified '{output_filepath_original}' with volume comment.")
-
-                # 5. Delete the _temp file
-                os.remove(output_filepath_temp)
-                print(f"Deleted '{output_filepath_temp}'")
-
-            except Exception as e:
-                print(f"Error processing file '{filename}': {e}")
+    filenames = sorted(
+        filename for filename in os.listdir(input_dir)
+        if filename.endswith(".py") and os.path.isfile(os.path.join(input_dir, filename))
+    )
+    sources = []
+    for filename in filenames:
+        with open(os.path.join(input_dir, filename)) as input_file:
+            sources.append(input_file.read())
 
+    def write_result(index, result):
+        for message in process_file(output_dir, filenames[index], sources[index], result):
+            print(message, flush=True)
+
+    Engine(executor=executor, jobs=jobs).run(list(zip(sources, filenames)), on_result=write_result)
 
-if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python script.py <input_directory> <output_directory>")
-        sys.exit(1)
 
-    input_directory = sys.argv[1]
-    output_directory = sys.argv[2]
+def process_file(output_dir, filename, source, result):
+    """
+    Writes the annotated copy of a single executed Python file.
+
+    Args:
+        output_dir (str): Path to the output directory.
+        filename (str): Name of the file inside the input directory.
+        source (str): Source of the file.
+        result (ExampleResult): Result of executing the file.
+
+    Returns:
+        list[str]: Log messages describing what was done.
+    """
+    messages = []
+    output_filepath = os.path.join(output_dir, filename)
+
+    if result.status == "ok":
+        messages.append(f"Executed '{filename}' and captured output: '{result.volume_text()}'")
+    else:
+        messages.append(f"Error executing '{filename}': {result.message}")
+
+    try:
+        with open(output_filepath, "w") as output_file:
+            output_file.write(annotated_source(source, result.volume_text()))
+        messages.append(f"Wrote '{output_filepath}' with volume comment.")
+    except OSError as e:
+        messages.append(f"Error processing file '{filename}': {e}")
+
+    return messages
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Execute build123d examples and append their volume as a comment.")
+    parser.add_argument("input_directory", help="Directory containing the example files")
+    parser.add_argument("output_directory", help="Directory for the annotated copies")
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of files to process concurrently (default: CPU count)"
+    )
+    parser.add_argument(
+        "--executor",
+        choices=EXECUTORS,
+        default="subprocess",
+        help="subprocess: new interpreter per file; pool: warm worker processes; inline: this process; "
+             "thread: threads of this process (default: subprocess)"
+    )
+    args = parser.parse_args()
+
+    input_directory = args.input_directory
+    output_directory = args.output_directory
 
     if not os.path.isdir(input_directory):
         print(f"Error: Input directory '{input_directory}' is not a valid directory.")
         sys.exit(1)
 
-    process_python_files(input_directory, output_directory)
-    print("Python file processing complete.")
\ No newline at end of file
+    process_python_files(input_directory, output_directory, jobs=args.jobs, executor=args.executor)
+    print("Python file processing complete.")
@@ -0,0 +1,227 @@
+"""
+Content-addressed store of executed parts.
+
+The "artifact" post-processor writes the part of every executed example as a
+native binary BREP file (OCC's BinTools format, which keeps every coordinate
+bit for bit, unlike the text format) named after the SHA-256 of the example
+source (the same hash the results database uses), so later stages such as
+export, comparison or rendering load the shape in milliseconds instead of
+re-running the modelling operations. An unchanged example is never written twice.
+The files are kept in a directory per set of installed build123d and OCP
+versions, so after an upgrade the parts are written again by the new kernel
+rather than reused from the old one.
+
+Exports to STEP, STL and BREP are stored next to the part as <hash>.step,
+<hash>.stl and <hash>.brep. The "export" post-processor writes them in the
+process that executed the example; export_stored() writes the missing ones of
+examples that were not executed (e.g. cached results) from their stored parts,
+in parallel worker processes. An export that exists is never written again.
+"""
+import argparse
+import importlib
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from part_properties import extract_properties
+from result_cache import versions_digest
+from results_db import DEFAULT_DATABASE, ResultsDatabase, source_hash
+
+DEFAULT_ARTIFACT_DIR = Path(".cache") / "artifacts"
+EXPORT_FORMATS = ("step", "stl", "brep")
+DEFAULT_STL_TOLERANCE = 0.01  # Maximum distance in mm between an STL export and the part's surface
+STL_ANGULAR_TOLERANCE = 0.1  # Maximum angle in radians between neighbouring triangles of an STL export
+
+
+class ArtifactStore:
+    """
+    Directory of <versions>/<hash[:2]>/<hash><suffix> files, one per library versions, example source
+    and format, where <versions> is the start of versions_digest(). Parts are stored as <hash>.bbrep,
+    exports as <hash>.<format>, and STL exports meshed with a tolerance other than
+    DEFAULT_STL_TOLERANCE as <hash>.<tolerance>mm.stl.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_ARTIFACT_DIR) -> None:
+        self.directory = Path(directory)
+        self.versions_directory = self.directory / versions_digest()[:16]
+
+    def path(self, digest: str, suffix: str = ".bbrep") -> Path:
+        """
+        Returns the path of the artifact of the source with this hash under the installed library
+        versions, whether or not it exists.
+        """
+        return self.versions_directory / digest[:2] / f"{digest}{suffix}"
+
+    def path_for_source(self, source: str, suffix: str = ".bbrep") -> Path:
+        return self.path(source_hash(source), suffix)
+
+    def save(self, digest: str, part: Any) -> Path:
+        """
+        Writes part as binary BREP unless the artifact already exists, and returns its path.
+        """
+        from OCP.BinTools import BinTools
+
+        return self._write(self.path(digest), lambda temp_path: BinTools.Write_s(part.wrapped, str(temp_path)))
+
+    def save_bytes(self, digest: str, suffix: str, data: bytes) -> Path:
+        """
+        Writes data as the artifact with this suffix unless it already exists, and returns its path.
+        """
+        return self._write(self.path(digest, suffix), lambda temp_path: temp_path.write_bytes(data))
+
+    def export_path(self, digest: str, export_format: str, stl_tolerance: Optional[float] = None) -> Path:
+        if export_format == "stl" and stl_tolerance not in (None, DEFAULT_STL_TOLERANCE):
+            return self.path(digest, f".{stl_tolerance:g}mm.stl")
+        return self.path(digest, f".{export_format}")
+
+    def export(
+        self, digest: str, part: Any, formats: Sequence[str] = EXPORT_FORMATS, stl_tolerance: Optional[float] = None
+    ) -> Dict[str, str]:
+        """
+        Exports part to each of formats (EXPORT_FORMATS) that is not stored yet, meshing STL exports
+        to stl_tolerance mm (default: DEFAULT_STL_TOLERANCE).
+
+        Returns:
+            dict: Path of the export by format.
+        """
+        import build123d
+
+        exporters = {
+            "step": build123d.export_step,
+            "stl": lambda shape, path: export_stl(shape, path, stl_tolerance or DEFAULT_STL_TOLERANCE),
+            "brep": build123d.export_brep,
+        }
+        return {
+            export_format: str(self._write(
+                self.export_path(digest, export_format, stl_tolerance),
+                lambda temp_path: exporters[export_format](part, str(temp_path)),
+            ))
+            for export_format in formats
+        }
+
+    def missing_exports(
+        self, digest: str, formats: Sequence[str] = EXPORT_FORMATS, stl_tolerance: Optional[float] = None
+    ) -> List[str]:
+        return [
+            export_format for export_format in formats
+            if not self.export_path(digest, export_format, stl_tolerance).exists()
+        ]
+
+    def _write(self, path: Path, write: Callable[[Path], Any]) -> Path:
+        """
+        Calls write(temp_path) and moves the file into place unless path already exists, and returns path.
+        """
+        if path.exists():
+            return path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Keep the suffix, from which the exporters choose the format
+        temp_path = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp{path.suffix}")
+        write(temp_path)
+        os.replace(temp_path, path)  # Atomic, so concurrent readers never see a partial artifact
+        return path
+
+    def load(self, digest: str) -> Optional[Any]:
+        """
+        Returns the stored shape of the source with this hash, or None if there is none.
+        """
+        path = self.path(digest)
+        if not path.exists():
+            return None
+        from build123d import Compound
+        from OCP.BinTools import BinTools
+        from OCP.TopoDS import TopoDS_Shape
+
+        shape = TopoDS_Shape()
+        BinTools.Read_s(shape, str(path))
+        return Compound.cast(shape)
+
+
+def export_stl(part: Any, path: str, tolerance: float = DEFAULT_STL_TOLERANCE) -> None:
+    """
+    Writes part as binary STL meshed to tolerance mm (not relative to the edge length, like build123d's export_stl).
+
+    The kernel's writer is used because, for a part that is not meshed yet, copying the mesh
+    into NumPy for mesh.write_stl costs more than the whole kernel export (python mesh.py measures both).
+    """
+    from OCP.BRepMesh import BRepMesh_IncrementalMesh
+    from OCP.StlAPI import StlAPI_Writer
+
+    BRepMesh_IncrementalMesh(part.wrapped, tolerance, False, STL_ANGULAR_TOLERANCE, True)
+    StlAPI_Writer().Write(part.wrapped, path)
+
+
+def _export_stored(
+    directory: Path, digest: str, formats: Sequence[str], stl_tolerance: Optional[float]
+) -> Optional[Dict[str, str]]:
+    store = ArtifactStore(directory)
+    part = store.load(digest)
+    return None if part is None else store.export(digest, part, formats, stl_tolerance)
+
+
+def export_stored(
+    store: ArtifactStore,
+    digests: Iterable[str],
+    formats: Sequence[str] = EXPORT_FORMATS,
+    jobs: Optional[int] = None,
+    stl_tolerances: Optional[Dict[str, float]] = None,
+) -> Dict[str, Optional[Dict[str, str]]]:
+    """
+    Exports the stored parts of digests to the formats they are missing, in up to jobs worker processes.
+    Parts whose exports all exist are not loaded, so only new or changed examples cost anything.
+
+    Args:
+        stl_tolerances (dict): STL mesh tolerance in mm by digest (default: DEFAULT_STL_TOLERANCE).
+
+    Returns:
+        dict: Path of every export by format, by digest; None for a digest without a stored part.
+    """
+    stl_tolerances = stl_tolerances or {}
+    results: Dict[str, Optional[Dict[str, str]]] = {}
+    missing = []
+    for digest in dict.fromkeys(digests):
+        stl_tolerance = stl_tolerances.get(digest)
+        if store.missing_exports(digest, formats, stl_tolerance):
+            missing.append(digest)
+        else:
+            results[digest] = {
+                export_format: str(store.export_path(digest, export_format, stl_tolerance))
+                for export_format in formats
+            }
+    if missing:
+        with ProcessPoolExecutor(min(jobs or os.cpu_count() or 1, len(missing))) as executor:
+            futures = {
+                digest: executor.submit(_export_stored, store.directory, digest, formats, stl_tolerances.get(digest))
+                for digest in missing
+            }
+            results.update((digest, future.result()) for digest, future in futures.items())
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load the stored BREP artifact of an example.")
+    parser.add_argument("example_id", help="Example id, e.g. example-29")
+    parser.add_argument("--database", type=Path, default=DEFAULT_DATABASE, help="Path of the results database")
+    parser.add_argument(
+        "--artifact-dir", type=Path, default=DEFAULT_ARTIFACT_DIR,
+        help=f"Directory of the artifact store (default: {DEFAULT_ARTIFACT_DIR})"
+    )
+    args = parser.parse_args()
+
+    with ResultsDatabase(args.database) as database:
+        stored = database.current([args.example_id])
+    if not stored:
+        parser.exit(1, f"No result for '{args.example_id}'\n")
+
+    importlib.import_module("build123d")  # Imported first so that only loading the artifact is timed
+
+    store = ArtifactStore(args.artifact_dir)
+    started = time.perf_counter()
+    shape = store.load(stored[0].source_hash)
+    if shape is None:
+        parser.exit(1, f"No artifact for '{args.example_id}' at {store.path(stored[0].source_hash)}\n")
+    print(f"Loaded {store.path(stored[0].source_hash)} in {(time.perf_counter() - started) * 1000:.1f} ms")
+    volume = extract_properties(shape, ["volume"])["volume"]  # Measured the same way as the recorded volume
+    print(f"Volume: {volume} mm^3 (recorded: {stored[0].result.volume_text()} mm^3)")
@@ -0,0 +1,169 @@
+"""
+Benchmark of the introductory examples with regression gates.
+
+Every example is executed several times in this process after build123d has
+been imported once, so the numbers measure modelling time only. Results are
+compared with a stored baseline, and the exit status is non-zero when an
+example became slower than the thresholds allow or its volume changed, so an
+upgrade of build123d or an edit of an example can be gated on it.
+"""
+import argparse
+import importlib
+import json
+import math
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from execution import run_source
+from result_cache import library_versions
+
+DEFAULT_BASELINE = Path("benchmark_baseline.json")
+
+
+class Measurement(NamedTuple):
+    """Build times of one example over all repetitions."""
+    name: str
+    median: float
+    p95: float
+    volume: Optional[float]
+    status: str
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """
+    Returns the nearest-rank percentile of values.
+    """
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def measure(example: Path, repeat: int, warmup: int) -> Measurement:
+    """
+    Executes an example warmup + repeat times and summarizes the build times of the last repeat runs.
+    """
+    source = example.read_text()
+    build_times = []
+    result = None
+    for iteration in range(warmup + repeat):
+        result = run_source(source, example.name)
+        if result.status != "ok":
+            return Measurement(example.name, 0.0, 0.0, None, result.status)
+        if iteration >= warmup:
+            build_times.append(result.build_time)
+    return Measurement(
+        example.name, statistics.median(build_times), percentile(build_times, 95), result.volume, result.status
+    )
+
+
+def compare(
+    measurements: List[Measurement],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+    p95_threshold: float,
+    min_delta: float,
+    volume_tolerance: float,
+) -> Dict[str, List[str]]:
+    """
+    Returns the regressions of each example against the baseline.
+
+    An example regresses when it fails, when its volume differs from the baseline by
+    more than volume_tolerance (relative), or when its median or p95 build time grows
+    beyond threshold or p95_threshold times the baseline and by more than min_delta seconds.
+    """
+    regressions: Dict[str, List[str]] = {}
+    for measurement in measurements:
+        reference = baseline.get(measurement.name)
+        problems = []
+        if measurement.status != "ok":
+            problems.append(f"status {measurement.status}")
+        elif reference is not None:
+            if reference.get("volume") is not None and not math.isclose(
+                measurement.volume, reference["volume"], rel_tol=volume_tolerance
+            ):
+                problems.append(f"volume {measurement.volume} != baseline {reference['volume']}")
+            for key, limit in (("median", threshold), ("p95", p95_threshold)):
+                value, reference_value = getattr(measurement, key), reference[key]
+                if value > reference_value * limit and value - reference_value > min_delta:
+                    problems.append(f"{key} {value:.4f}s > {limit:g} x baseline {reference_value:.4f}s")
+        if problems:
+            regressions[measurement.name] = problems
+    return regressions
+
+
+def format_table(measurements: List[Measurement], baseline: Dict[str, Dict[str, float]]) -> str:
+    lines = [f"{'example':<18} {'median (s)':>11} {'p95 (s)':>10} {'vs base':>8} {'volume (mm^3)':>18}"]
+    for measurement in measurements:
+        reference = baseline.get(measurement.name)
+        ratio = f"{measurement.median / reference['median']:.2f}x" if reference and reference["median"] else "-"
+        volume = f"{measurement.volume:.6g}" if measurement.volume is not None else measurement.status
+        lines.append(
+            f"{measurement.name:<18} {measurement.median:>11.4f} {measurement.p95:>10.4f} {ratio:>8} {volume:>18}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the build123d examples against a stored baseline.")
+    parser.add_argument("examples", type=Path, nargs="?", default=Path("examples"), help="Directory of examples")
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="Measured runs per example (default: 5)")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured runs per example (default: 1)")
+    parser.add_argument(
+        "--baseline", type=Path, default=DEFAULT_BASELINE, help=f"Baseline file (default: {DEFAULT_BASELINE})"
+    )
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument(
+        "--threshold", type=float, default=1.25, help="Allowed median slowdown factor (default: 1.25)"
+    )
+    parser.add_argument(
+        "--p95-threshold", type=float, default=1.5, help="Allowed p95 slowdown factor (default: 1.5)"
+    )
+    parser.add_argument(
+        "--min-delta", type=float, default=0.005,
+        help="Slowdowns smaller than this many seconds are treated as noise (default: 0.005)"
+    )
+    parser.add_argument(
+        "--volume-tolerance", type=float, default=1e-9, help="Allowed relative volume change (default: 1e-9)"
+    )
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    importlib.import_module("build123d")  # Warm the process so only modelling time is measured
+    print(f"Imported build123d in {time.perf_counter() - started:.2f}s")
+
+    examples = sorted(path for path in args.examples.glob("*.py") if path.is_file())
+    measurements = [measure(example, args.repeat, args.warmup) for example in examples]
+
+    baseline = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())["examples"]
+    elif not args.save_baseline:
+        print(f"No baseline at {args.baseline}; only failures are reported. Use --save-baseline to create one.")
+    print(format_table(measurements, baseline))
+
+    if args.save_baseline:
+        failed = [measurement for measurement in measurements if measurement.status != "ok"]
+        if failed:
+            # A baseline without them would never flag those examples, so it is not saved at all
+            for measurement in failed:
+                print(f"FAILED {measurement.name}: status {measurement.status}")
+            parser.exit(1, f"Not saving the baseline: {len(failed)} example(s) failed\n")
+        args.baseline.write_text(json.dumps({
+            "versions": library_versions(),
+            "examples": {
+                measurement.name: {"median": measurement.median, "p95": measurement.p95, "volume": measurement.volume}
+                for measurement in measurements
+            },
+        }, indent=2))
+        print(f"Saved baseline to {args.baseline}")
+        sys.exit(0)
+
+    regressions = compare(
+        measurements, baseline, args.threshold, args.p95_threshold, args.min_delta, args.volume_tolerance
+    )
+    for name, problems in regressions.items():
+        print(f"REGRESSION {name}: {'; '.join(problems)}")
+    sys.exit(1 if regressions else 0)
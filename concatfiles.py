@@ -19,15 +19,26 @@ def append_files_to_output(input_dir: Path, output_file: Path) -> None:
     # Open the output file in append mode
     with output_file.open("a") as outfile:
         # Iterate over all files in the input directory
-        for file_path in sorted(input_dir.glob('*')):  # Sort files for consistent order
-            if file_path.is_file():  # Process only files, ignore subdirectories
+        for file_path in sorted(input_dir.glob('*.py')):  # Sort files for consistent order
+            if file_path.is_file():  # Process only files, ignore subdirectories and telemetry
                 print(f"Appending {file_path.name} to {output_file}")
-                
-                # Append a separator and the file name as a comment
-                outfile.write(f"\n\n# Contents of {file_path.name}\n")
-                
-                # Append the file's contents
-                outfile.write(file_path.read_text())
+                outfile.write(file_section(file_path))
+
+def file_section(file_path: Path) -> str:
+    """
+    Returns a file's contents preceded by a separator and its name as a comment.
+    """
+    return f"\n\n# Contents of {file_path.name}\n" + file_path.read_text()
+
+def rewrite_output(input_dir: Path, output_file: Path) -> None:
+    """
+    Replaces the output file with the contents of all files in the input directory.
+
+    Unlike append_files_to_output, running it again leaves a single copy of every file,
+    so it can be used to keep the output file up to date.
+    """
+    sections = [file_section(file_path) for file_path in sorted(input_dir.glob('*.py')) if file_path.is_file()]
+    output_file.write_text("".join(sections))
 
 if __name__ == "__main__":
     # Set up argument parsing
@@ -0,0 +1,319 @@
+"""
+Execution engine shared by main2.py and append_volume.py.
+
+The engine takes (source, name) tasks, reuses cached results where it can,
+executes every remaining example exactly once with the selected executor, and
+returns results in task order. Everything measured about the part (volume,
+properties, validity, exports, ...) is produced by the post-processors named in
+RunOptions during that single execution.
+"""
+import asyncio
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from execution import IMPORTED_MARKER, ExampleResult, Limits, RunOptions, run_source
+from part_properties import VOLUME_PRECISIONS
+from result_cache import ResultCache
+from scheduler import RuntimeHistory, example_runtime
+from worker_pool import RecyclePolicy, WorkerPool
+
+EXECUTORS = ("subprocess", "pool", "inline", "thread")
+EXECUTION_SCRIPT = Path(__file__).with_name("execution.py")
+
+Task = Tuple[str, str]  # (source, name)
+ResultCallback = Callable[[int, ExampleResult], None]  # Called with (task index, result) as each task completes
+
+
+async def _communicate(
+    process: asyncio.subprocess.Process, source: bytes, imported: List[float]
+) -> Tuple[bytes, bytes]:
+    """
+    Like process.communicate(source), but removes the IMPORTED_MARKER line from stdout and appends
+    the time.monotonic() at which it arrived to imported.
+    """
+    marker = f"\n{IMPORTED_MARKER}\n".encode()
+
+    async def feed() -> None:
+        try:
+            process.stdin.write(source)
+            await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The interpreter exited before reading its source; its stderr says why
+        process.stdin.close()
+
+    async def read_stdout() -> bytes:
+        output = b""
+        while True:
+            chunk = await process.stdout.read(65536)
+            if not chunk:
+                return output
+            output += chunk
+            index = -1 if imported else (b"\n" + output).find(marker)
+            if index >= 0:
+                imported.append(time.monotonic())
+                output = output[:index] + output[index + len(marker) - 1:]
+
+    _, stdout, stderr = await asyncio.gather(feed(), read_stdout(), process.stderr.read())
+    await process.wait()
+    return stdout, stderr
+
+
+async def run_subprocess_async(
+    source: str, name: str, limits: Limits = Limits(), options: RunOptions = RunOptions()
+) -> ExampleResult:
+    """
+    Runs an example source in a new interpreter and returns its result.
+
+    The source is piped to execution.py in the new interpreter, so no temporary copy is
+    written, and the result comes back as a JSON line on stdout. The interpreter is
+    killed if it exceeds the resident memory limit, or the wall-clock limit counted from
+    when it reports that the example's leading imports are done, so interpreter startup
+    and importing build123d do not count. While it runs, the event loop is free to start,
+    feed and collect other interpreters.
+
+    Args:
+        source (str): Source of the example.
+        name (str): File name of the example, used for the result.
+        limits (Limits): Resource limits for the example.
+        options (RunOptions): What to collect besides the volume.
+
+    Returns:
+        ExampleResult: The result reported by the interpreter, or its error output.
+        wall_time includes interpreter startup.
+    """
+    # Use sys.executable to ensure correct python interpreter
+    command = [sys.executable, str(EXECUTION_SCRIPT), "--name", name, "--options", json.dumps(options._asdict())]
+    if limits.max_address_space_mb is not None:
+        command += ["--max-address-space", str(limits.max_address_space_mb)]
+
+    process = await asyncio.create_subprocess_exec(
+        *command, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    started = time.monotonic()
+    imported: List[float] = []
+    communicate = asyncio.ensure_future(_communicate(process, source.encode(), imported))
+    while True:
+        done, _ = await asyncio.wait({communicate}, timeout=limits.poll_interval())
+        if done:
+            break
+        # Until the imports are done, only the memory limit applies
+        status = limits.exceeded(process.pid, imported[0] if imported else time.monotonic())
+        if status is not None:
+            process.kill()
+            await communicate
+            return ExampleResult(
+                name, status, message=limits.exceeded_message(status), wall_time=time.monotonic() - started,
+                exit_code=process.returncode
+            )
+
+    wall_time = time.monotonic() - started
+    stdout, stderr = (data.decode(errors="replace") for data in communicate.result())
+    try:
+        result = ExampleResult(**json.loads(stdout.strip().splitlines()[-1]))
+    except (ValueError, IndexError, TypeError):
+        status = limits.failure_status(stderr, process.returncode) if process.returncode else "error"
+        return ExampleResult(
+            name, status, message=stderr or f"Unexpected output: {stdout!r}", wall_time=wall_time,
+            exit_code=process.returncode
+        )
+    return result._replace(wall_time=wall_time, exit_code=process.returncode)
+
+
+def run_subprocess(
+    source: str, name: str, limits: Limits = Limits(), options: RunOptions = RunOptions()
+) -> ExampleResult:
+    """
+    Blocking form of run_subprocess_async, for running a single example.
+    """
+    return asyncio.run(run_subprocess_async(source, name, limits, options))
+
+
+class Engine:
+    """
+    Executes examples once each with one of EXECUTORS and returns their results.
+
+    Args:
+        executor (str): "subprocess" starts a new interpreter per example, "pool" uses warm
+            worker processes that import build123d once, "inline" executes in this process,
+            "thread" executes on a pool of threads in this process, which only runs in parallel
+            where the kernel releases the GIL (see gil_report.py).
+        jobs (int): Number of examples to execute concurrently (default: CPU count).
+        limits (Limits): Per-example resource limits. The timeout counts from the end of the
+            example's leading imports. The inline executor only enforces the timeout, and only
+            between Python bytecodes; the thread executor enforces none.
+        options (RunOptions): Properties and post-processors to apply to every part.
+        cache (ResultCache): Reuse results of examples whose source has not changed (default: no cache).
+        history (RuntimeHistory): Dispatch examples longest-first and record their runtimes.
+        recycle (RecyclePolicy): When the "pool" executor replaces a worker with a preloaded spare.
+    """
+
+    def __init__(
+        self,
+        executor: str = "subprocess",
+        jobs: Optional[int] = None,
+        limits: Limits = Limits(),
+        options: RunOptions = RunOptions(),
+        cache: Optional[ResultCache] = None,
+        history: Optional[RuntimeHistory] = None,
+        recycle: RecyclePolicy = RecyclePolicy(),
+    ) -> None:
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor '{executor}', expected one of {', '.join(EXECUTORS)}")
+        self.executor = executor
+        self.jobs = jobs or os.cpu_count() or 1
+        self.limits = limits
+        self.options = options
+        self.cache = cache
+        self.history = history
+        self.recycle = recycle
+        self.keep_pool = False
+        self.pool: Optional[WorkerPool] = None
+
+    def __enter__(self) -> "Engine":
+        """
+        With the "pool" executor, keeps the warm workers started by the first run() for
+        every later run() until exit, so repeated runs (e.g. watch mode) do not pay the
+        build123d import again.
+        """
+        self.keep_pool = True
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.keep_pool = False
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+    def _is_complete(self, result: ExampleResult) -> bool:
+        """
+        Returns whether a cached result has everything the current options ask for, with a
+        volume at least as precise as requested and within the requested tolerance.
+        """
+        properties = result.properties or {"volume": None}
+        outputs = result.outputs or {}
+        precision = properties.get("volume_precision", "default")
+        error = properties.get("volume_error")
+        precise = self.options.volume_precision == "default" or error is None or error <= self.options.volume_tolerance
+        return set(self.options.properties) <= set(properties) and \
+            VOLUME_PRECISIONS.index(precision) >= VOLUME_PRECISIONS.index(self.options.volume_precision) and \
+            precise and \
+            all(name in outputs for name in self.options.post_processors if name != "properties")
+
+    def run(self, tasks: Sequence[Task], on_result: Optional[ResultCallback] = None) -> List[ExampleResult]:
+        """
+        Returns the result of every (source, name) task, in task order.
+
+        Cached results are marked with cached=True. Nothing is read from the cache
+        while profiling, because cached results have no profile.
+
+        Args:
+            tasks (Sequence[Task]): (source, name) pairs to run.
+            on_result (ResultCallback): Called with (task index, result) as soon as each result
+                is available, cached results first, so callers can stream results to disk and
+                the console instead of waiting for the whole corpus.
+        """
+        results: List[Optional[ExampleResult]] = [None] * len(tasks)
+        if self.cache is not None and self.options.profile_dir is None:
+            for index, (source, name) in enumerate(tasks):
+                cached = self.cache.get(source, name)
+                if cached is not None and self._is_complete(cached):
+                    results[index] = cached
+                    if on_result is not None:
+                        on_result(index, cached)
+
+        missing = [index for index, result in enumerate(results) if result is None]
+
+        def complete(position: int, result: ExampleResult) -> None:
+            index = missing[position]
+            results[index] = result
+            if self.cache is not None:
+                self.cache.put(tasks[index][0], result)
+            if on_result is not None:
+                on_result(index, result)
+
+        self.execute([tasks[index] for index in missing], complete)
+        if self.cache is not None:
+            self.cache.evict()
+        return results
+
+    def execute(self, tasks: Sequence[Task], on_result: Optional[ResultCallback] = None) -> List[ExampleResult]:
+        """
+        Executes every task, longest-first when there is a runtime history, and returns the
+        results in task order. on_result is called with (task index, result) as each task completes.
+        """
+        if not tasks:
+            return []
+        if self.history is None:
+            return self.dispatch(tasks, on_result)
+
+        order = self.history.longest_first(tasks)
+
+        def complete(position: int, result: ExampleResult) -> None:
+            self.history.record(result.name, example_runtime(result))
+            if on_result is not None:
+                on_result(order[position], result)
+
+        results: List[Optional[ExampleResult]] = [None] * len(tasks)
+        for index, result in zip(order, self.dispatch([tasks[index] for index in order], complete)):
+            results[index] = result
+        self.history.save()
+        return results
+
+    def dispatch(self, tasks: Sequence[Task], on_result: Optional[ResultCallback] = None) -> List[ExampleResult]:
+        """
+        Executes tasks, starting them in the given order, and returns the results in the same order.
+        on_result is called with (task index, result) in completion order.
+        """
+        results: List[Optional[ExampleResult]] = [None] * len(tasks)
+
+        def complete(index: int, result: ExampleResult) -> None:
+            results[index] = result
+            if on_result is not None:
+                on_result(index, result)
+
+        if self.executor == "inline":
+            for index, (source, name) in enumerate(tasks):
+                complete(index, run_source(source, name, self.limits.timeout, self.options))
+        elif self.executor == "thread":
+            # Import once up front rather than under the import lock in every thread
+            importlib.import_module("build123d")
+            with ThreadPoolExecutor(max_workers=self.jobs) as thread_pool:
+                futures = {
+                    thread_pool.submit(run_source, source, name, options=self.options): index
+                    for index, (source, name) in enumerate(tasks)
+                }
+                for future in as_completed(futures):
+                    complete(futures[future], future.result())
+        elif self.executor == "pool" and self.keep_pool:
+            if self.pool is None:
+                self.pool = WorkerPool(self.jobs, self.limits, self.options, self.recycle)
+            for index, result in self.pool.imap_unordered(tasks):
+                complete(index, result)
+        elif self.executor == "pool":
+            with WorkerPool(min(self.jobs, len(tasks)), self.limits, self.options, self.recycle) as pool:
+                for index, result in pool.imap_unordered(tasks):
+                    complete(index, result)
+        else:
+            asyncio.run(self._dispatch_subprocesses(tasks, complete))
+        return results
+
+    async def _dispatch_subprocesses(self, tasks: Sequence[Task], complete: ResultCallback) -> None:
+        # One controller drives every interpreter; the semaphore keeps at most jobs of them alive,
+        # and its waiters are woken in order, so tasks start in the order given
+        semaphore = asyncio.Semaphore(self.jobs)
+
+        async def run(index: int, task: Task) -> None:
+            async with semaphore:
+                result = await run_subprocess_async(*task, self.limits, self.options)
+            complete(index, result)
+
+        await asyncio.gather(*(run(index, task) for index, task in enumerate(tasks)))
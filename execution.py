@@ -0,0 +1,367 @@
+import argparse
+import ast
+import cProfile
+import importlib
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Optional, Tuple
+
+import incremental
+import memoization
+from part_properties import DEFAULT_VOLUME_TOLERANCE
+from post_processors import PostContext, run_post_processors
+from profiling import profile_path
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+POLL_INTERVAL = 0.2  # Seconds between limit checks of a running example
+IMPORTED_MARKER = "# imported"  # Line the subprocess executor prints when the leading imports are done
+
+# Text in an error message that means the example ran out of memory
+MEMORY_ERROR_MARKERS = ("MemoryError", "std::bad_alloc", "Standard_OutOfMemory")
+
+
+class ExampleResult(NamedTuple):
+    """Outcome of executing a single example."""
+    name: str  # Example file name, e.g. example-01.py
+    status: str  # "ok", "error", "timeout" or "oom"
+    volume: Optional[float] = None  # part.volume when status is "ok"
+    message: str = ""  # Traceback or other diagnostic when status is not "ok"
+    wall_time: float = 0.0  # Seconds spent executing the example
+    cpu_time: float = 0.0  # CPU seconds spent by the executing process
+    import_time: float = 0.0  # Part of wall_time spent in the leading import statements
+    build_time: float = 0.0  # Part of wall_time spent in the rest of the example
+    peak_rss_mb: float = 0.0  # Peak resident memory of the executing process
+    exit_code: Optional[int] = None  # Exit code of the executing process, if it exited
+    properties: Optional[Dict[str, Any]] = None  # Measured part properties, see part_properties.PROPERTY_NAMES
+    outputs: Optional[Dict[str, Any]] = None  # Output of each post-processor, see post_processors.POST_PROCESSORS
+    cached: bool = False  # Reused from the result cache instead of executed in this run
+
+    def volume_text(self) -> str:
+        """
+        Returns the text written into the "# Volume: ... mm^3" comment.
+        """
+        if self.status == "ok":
+            return str(self.volume)
+        if self.status == "error":
+            return "Error during execution"
+        return f"Error during execution ({self.status})"
+
+
+class Limits(NamedTuple):
+    """Resource limits applied to each example. None means unlimited."""
+    timeout: Optional[float] = None  # Wall-clock seconds
+    max_rss_mb: Optional[float] = None  # Resident memory, polled by the controlling process (Linux only)
+    max_address_space_mb: Optional[int] = None  # RLIMIT_AS of the process executing the example
+
+    def poll_interval(self) -> Optional[float]:
+        """
+        Returns how often a running example must be checked, or None if it can be waited on indefinitely.
+        """
+        if self.timeout is None and self.max_rss_mb is None:
+            return None
+        return POLL_INTERVAL
+
+    def exceeded(self, pid: int, started: float) -> Optional[str]:
+        """
+        Returns "timeout" or "oom" if the example running in process pid has exceeded a limit.
+
+        Args:
+            pid (int): Process executing the example.
+            started (float): time.monotonic() when the example was started.
+        """
+        if self.timeout is not None and time.monotonic() - started > self.timeout:
+            return "timeout"
+        if self.max_rss_mb is not None and rss_mb(pid) > self.max_rss_mb:
+            return "oom"
+        return None
+
+    def exceeded_message(self, status: str) -> str:
+        """
+        Returns the diagnostic recorded for an example killed with the given exceeded() status.
+        """
+        if status == "timeout":
+            return f"Killed after exceeding the {self.timeout} s timeout"
+        return f"Killed after exceeding {self.max_rss_mb} MiB resident memory"
+
+    def failure_status(self, message: str, exitcode: Optional[int] = None) -> str:
+        """
+        Classifies a failed example as "oom" or "error" from its error output and exit code.
+        """
+        if any(marker in message for marker in MEMORY_ERROR_MARKERS):
+            return "oom"
+        # A kernel that cannot allocate under RLIMIT_AS usually aborts instead of raising
+        if exitcode is not None and exitcode < 0 and self.max_address_space_mb is not None:
+            return "oom"
+        return "error"
+
+
+class RunOptions(NamedTuple):
+    """What to collect while executing an example, besides its volume."""
+    profile_dir: Optional[str] = None  # Write <profile_dir>/<example>.pstats with cProfile stats
+    properties: Tuple[str, ...] = ("volume",)  # Part properties to measure, see part_properties.PROPERTY_NAMES
+    volume_precision: str = "default"  # One of part_properties.VOLUME_PRECISIONS
+    volume_tolerance: float = DEFAULT_VOLUME_TOLERANCE  # Estimated relative error that refines a fast volume
+    post_processors: Tuple[str, ...] = ()  # Applied to the part after "properties", see post_processors
+    plugins: Tuple[str, ...] = ()  # Modules imported before execution, e.g. to register post-processors
+    export_dir: Optional[str] = None  # Where the "export" post-processor also links <example>.<format>
+    export_formats: Tuple[str, ...] = ("step", "stl", "brep")  # Formats of the "export" post-processor
+    stl_tolerance: Optional[float] = None  # STL mesh deflection in mm; None for artifacts.DEFAULT_STL_TOLERANCE
+    stl_tolerances: Tuple[Tuple[str, float], ...] = ()  # (example stem, deflection in mm) overriding stl_tolerance
+    artifact_dir: Optional[str] = None  # Store of the "artifact" post-processor, see artifacts.py
+    mesh_tolerance: Optional[float] = None  # Mesh deflection in mm for "mesh_check"; see post_processors.mesh_tolerance
+    memoize: int = 0  # LRU size for memoized kernel operations, kept across examples in one process; 0 disables
+    incremental: int = 0  # Snapshots kept per process to resume edited examples from, see incremental.py; 0 disables
+
+
+class ExampleTimeout(BaseException):
+    """Raised inside an inline example when its timeout expires. Not an Exception so examples cannot swallow it."""
+
+
+def limit_address_space(max_address_space_mb: Optional[int]) -> None:
+    """
+    Caps the address space of the current process, so runaway allocations fail instead of swapping.
+    """
+    if max_address_space_mb is None or resource is None:
+        return
+    limit = int(max_address_space_mb * 1024 * 1024)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def rss_mb(pid: int) -> float:
+    """
+    Returns the resident memory of a process in MiB, or 0.0 where /proc is not available.
+    """
+    try:
+        with open(f"/proc/{pid}/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return 0.0
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+@contextmanager
+def _alarm(timeout: Optional[float]) -> Iterator[None]:
+    """
+    Raises ExampleTimeout in the main thread after timeout seconds.
+
+    Best effort only: the signal is handled once control returns to Python, so a
+    single long kernel call is not interrupted.
+    """
+    if timeout is None or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def handler(signum, frame):
+        raise ExampleTimeout()
+
+    previous = signal.signal(signal.SIGALRM, handler)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def reset_peak_rss() -> None:
+    """
+    Resets the peak resident memory counter of this process (Linux only), so that
+    peak_rss_mb() covers a single example even in a long-lived worker.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    """
+    Returns the peak resident memory of this process in MiB.
+    """
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return 0.0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024  # Bytes on macOS, KiB elsewhere
+
+
+def _split_imports(tree: ast.Module) -> Tuple[ast.Module, ast.Module]:
+    """
+    Splits a module into its leading import statements (and docstring) and the rest.
+    """
+    count = 0
+    for statement in tree.body:
+        is_docstring = isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Constant)
+        if not (isinstance(statement, (ast.Import, ast.ImportFrom)) or is_docstring):
+            break
+        count += 1
+    return ast.Module(tree.body[:count], type_ignores=[]), ast.Module(tree.body[count:], type_ignores=[])
+
+
+@contextmanager
+def _profiled(profile_dir: Optional[str], name: str) -> Iterator[None]:
+    """
+    Runs the body under cProfile and dumps the stats for the example, if profile_dir is set.
+    """
+    if profile_dir is None:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        path = profile_path(profile_dir, name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(path))
+
+
+def _exit_code(error: BaseException) -> int:
+    """
+    Returns the exit code of an interpreter ended by an uncaught exception, as Python computes it.
+    """
+    if not isinstance(error, SystemExit):
+        return 1
+    if error.code is None:
+        return 0
+    return error.code if isinstance(error.code, int) else 1
+
+
+def run_source(
+    source: str,
+    name: str,
+    timeout: Optional[float] = None,
+    options: RunOptions = RunOptions(),
+    on_imported: Optional[Callable[[], None]] = None,
+) -> ExampleResult:
+    """
+    Executes an example source in a fresh namespace and post-processes the part it defines.
+
+    The leading import statements are timed separately from the rest of the example,
+    so the telemetry distinguishes import cost from modelling cost. The live part is
+    then handed to the requested post-processors; the volume and other properties
+    come from the "properties" post-processor, which always runs first.
+
+    With options.incremental, an example whose leading statements are unchanged since a
+    previous execution in this process resumes from the snapshot taken after them.
+
+    Outside the main thread, cpu_time is the CPU time of the calling thread and
+    peak_rss_mb is the peak of the whole process.
+
+    Args:
+        source (str): Python source of the example.
+        name (str): Name used for tracebacks and for the result.
+        timeout (float): Wall-clock limit on everything after the leading imports, enforced with
+            SIGALRM when running in the main thread.
+        options (RunOptions): What to collect besides the volume.
+        on_imported (Callable): Called once the leading imports are done, so executors that enforce
+            the timeout from another process can start its clock there.
+
+    Returns:
+        ExampleResult: The measured volume, or the error raised by the example. An example that
+        calls sys.exit() is an "error" with the exit code it asked for.
+    """
+    namespace = {"__name__": "__main__", "__file__": name}
+    status, volume, outputs, message, exit_code = "ok", None, None, "", None
+    imported = None
+    # Other examples may be running in other threads of this process (thread executor), so
+    # measure this thread's CPU time and leave the process-wide peak RSS counter alone there
+    in_main_thread = threading.current_thread() is threading.main_thread()
+    cpu_clock = time.process_time if in_main_thread else time.thread_time
+    if in_main_thread:
+        reset_peak_rss()
+    started = time.perf_counter()
+    cpu_started = cpu_clock()
+    try:
+        with _profiled(options.profile_dir, name):
+            imports, body = _split_imports(ast.parse(source, name))
+            exec(compile(imports, name, "exec"), namespace)
+            memo = memoization.install(options.memoize) if options.memoize else None
+            memo_before = memo.stats() if memo is not None else None
+            if options.incremental:
+                incremental.install(options.incremental)
+            imported = time.perf_counter()
+            if on_imported is not None:
+                on_imported()
+            with _alarm(timeout):
+                if options.incremental:
+                    resumed = incremental.execute(body, name, namespace, context=ast.dump(imports))
+                else:
+                    exec(compile(body, name, "exec"), namespace)
+                for plugin in options.plugins:
+                    importlib.import_module(plugin)
+                outputs = run_post_processors(namespace["part"], PostContext(name, source, options, {}))
+            volume = outputs["properties"]["volume"]
+            if memo is not None:
+                memo_after = memo.stats()
+                outputs["memoization"] = {
+                    counter: memo_after[counter] - memo_before[counter] for counter in ("hits", "misses", "bypassed")
+                }
+            if options.incremental:
+                outputs["incremental"] = resumed
+    except ExampleTimeout:
+        status, message = "timeout", f"Interrupted after exceeding the {timeout} s timeout"
+    except MemoryError:
+        status, message = "oom", traceback.format_exc()
+    except Exception:
+        status, message = "error", traceback.format_exc()
+    except KeyboardInterrupt:
+        raise
+    except BaseException as error:
+        # sys.exit() and the like must not end the host process; record the code the process would exit with
+        status, message = "error", traceback.format_exc()
+        exit_code = _exit_code(error)
+    finished = time.perf_counter()
+
+    return ExampleResult(
+        name,
+        status,
+        volume,
+        message,
+        wall_time=finished - started,
+        cpu_time=cpu_clock() - cpu_started,
+        import_time=(imported or finished) - started,
+        build_time=finished - imported if imported else 0.0,
+        peak_rss_mb=peak_rss_mb(),
+        properties=outputs["properties"] if outputs else None,
+        outputs={name: value for name, value in outputs.items() if name != "properties"} if outputs else None,
+        exit_code=exit_code,
+    )
+
+
+if __name__ == "__main__":
+    # Used by the subprocess executor: run the example piped to stdin and print its result as JSON
+    parser = argparse.ArgumentParser(description="Execute a build123d example read from stdin.")
+    parser.add_argument("--name", default="<stdin>", help="Name of the example")
+    parser.add_argument("--max-address-space", type=int, help="Address-space limit in MiB")
+    parser.add_argument("--options", type=json.loads, default={}, help="RunOptions as a JSON object")
+    args = parser.parse_args()
+
+    limit_address_space(args.max_address_space)
+    result = run_source(
+        sys.stdin.read(), args.name, options=RunOptions(**args.options),
+        on_imported=lambda: print(IMPORTED_MARKER, flush=True)
+    )
+    print(json.dumps(result._asdict()), flush=True)
+    sys.stderr.flush()
+    # Tearing down the kernel's objects takes most of a second, which would count against the timeout
+    os._exit(result.exit_code or 0)
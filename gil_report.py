@@ -0,0 +1,262 @@
+"""
+Measures which build123d operations release the GIL, to choose between the
+thread and process executors.
+
+Every operation is timed serially and then with the same number of calls per
+thread on several threads at once. An operation whose kernel call releases the
+GIL scales with the threads; one that holds it does not. While the serial runs
+execute, a probe thread counts how often it gets the GIL, relative to an idle
+interpreter, as a second, independent measurement.
+
+With --examples, the corpus is also executed with the thread and the pool
+executor, and the wall times and volumes are compared. Both executors run the
+same code on the same kernel, but OCC's boolean results depend on allocation
+order, so even two runs with the same executor can differ in the last bits of
+a volume; volumes are therefore compared with a relative tolerance, and the
+number of bit-for-bit identical volumes is reported alongside.
+"""
+import argparse
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple
+
+from engine import Engine
+from part_properties import is_valid
+
+RELEASES_EFFICIENCY = 0.6  # Parallel efficiency from which an operation counts as releasing the GIL
+PARTLY_SPEEDUP = 1.3  # Speedup from which it counts as releasing the GIL part of the time
+
+
+class Operation(NamedTuple):
+    """A build123d operation; setup builds its inputs once per thread so threads share no shapes."""
+    name: str
+    setup: Callable[[], Any]
+    run: Callable[[Any], Any]
+
+
+class OperationReport(NamedTuple):
+    name: str
+    serial_time: float  # Seconds per call on one thread
+    speedup: float  # Throughput on all threads relative to one thread
+    efficiency: float  # speedup / the number of threads that can run at once on this machine
+    probe_share: float  # Probe thread progress during the calls relative to an idle interpreter
+    verdict: str  # "releases", "partly", "holds", or "unknown" on a single CPU
+
+
+def operations() -> List[Operation]:
+    """
+    Returns the operations the examples spend most of their time in.
+    """
+    import build123d as bd
+
+    def shapes():
+        return bd.Box(10, 20, 30), bd.Cylinder(5, 40), bd.Sphere(12)
+
+    def stl_path():
+        return Path(tempfile.mkdtemp(prefix="gil_report_")) / "part.stl"
+
+    return [
+        Operation("Box", lambda: None, lambda _: bd.Box(10, 20, 30)),
+        Operation("Cylinder", lambda: None, lambda _: bd.Cylinder(5, 40)),
+        Operation("Sphere", lambda: None, lambda _: bd.Sphere(12)),
+        Operation("extrude", lambda: bd.Rectangle(10, 20), lambda sketch: bd.extrude(sketch, amount=5)),
+        Operation(
+            "revolve", lambda: bd.Pos(10, 0) * bd.Rectangle(4, 10), lambda sketch: bd.revolve(sketch, bd.Axis.Y)
+        ),
+        Operation(
+            "loft",
+            lambda: [bd.Circle(10), bd.Pos(0, 0, 20) * bd.Rectangle(8, 8)],
+            lambda sections: bd.loft(sections),
+        ),
+        Operation("fuse", shapes, lambda inputs: inputs[0] + inputs[1]),
+        Operation("cut", shapes, lambda inputs: inputs[0] - inputs[1]),
+        Operation("intersect", shapes, lambda inputs: inputs[0] & inputs[2]),
+        Operation("fillet", lambda: bd.Box(10, 20, 30), lambda box: bd.fillet(box.edges(), radius=1)),
+        Operation("chamfer", lambda: bd.Box(10, 20, 30), lambda box: bd.chamfer(box.edges(), length=1)),
+        Operation("volume", lambda: shapes()[0] - shapes()[1], lambda part: part.volume),
+        Operation("is_valid", lambda: shapes()[0] - shapes()[1], is_valid),
+        Operation("tessellate", lambda: shapes()[2], lambda part: part.tessellate(0.01)),
+        Operation(
+            "export_stl", lambda: (shapes()[0] - shapes()[1], stl_path()),
+            lambda inputs: bd.export_stl(inputs[0], str(inputs[1])),
+        ),
+    ]
+
+
+def _probe_rate(busy: Callable[[], None]) -> float:
+    """
+    Returns how many loop iterations per second a probe thread completes while busy() runs.
+    """
+    count = 0
+    stop = threading.Event()
+
+    def probe():
+        nonlocal count
+        while not stop.is_set():
+            count += 1
+
+    thread = threading.Thread(target=probe)
+    started = time.perf_counter()
+    thread.start()
+    busy()
+    stop.set()
+    thread.join()
+    return count / (time.perf_counter() - started)
+
+
+def _parallel_time(operation: Operation, threads: int, repeat: int) -> float:
+    """
+    Returns the seconds needed for repeat calls on each of threads threads at once.
+    """
+    states = [operation.setup() for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def work(state):
+        barrier.wait()
+        for _ in range(repeat):
+            operation.run(state)
+
+    workers = [threading.Thread(target=work, args=(state,)) for state in states]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started
+
+
+def measure(operation: Operation, threads: int, repeat: int) -> OperationReport:
+    """
+    Measures the serial time, thread scaling and probe share of one operation.
+    """
+    state = operation.setup()
+    operation.run(state)  # Warm up caches and lazy imports
+
+    def serial():
+        for _ in range(repeat):
+            operation.run(state)
+
+    started = time.perf_counter()
+    serial()
+    serial_time = time.perf_counter() - started
+    # Compare with an idle interpreter over the same duration
+    idle_rate = _probe_rate(lambda: time.sleep(serial_time))
+    probe_share = _probe_rate(serial) / idle_rate
+
+    speedup = serial_time * threads / _parallel_time(operation, threads, repeat)
+    usable = min(threads, os.cpu_count() or 1)
+    efficiency = speedup / usable
+    if usable < 2:
+        verdict = "unknown"  # Threads cannot run at the same time, so scaling says nothing about the GIL
+    elif efficiency >= RELEASES_EFFICIENCY:
+        verdict = "releases"
+    elif speedup >= PARTLY_SPEEDUP:
+        verdict = "partly"
+    else:
+        verdict = "holds"
+    return OperationReport(operation.name, serial_time / repeat, speedup, efficiency, probe_share, verdict)
+
+
+def format_report(reports: List[OperationReport], threads: int) -> str:
+    lines = [
+        f"GIL report with {threads} threads (speedup of {threads} threads over one; "
+        "probe = share of an idle interpreter's progress a Python thread keeps during the call)",
+        f"{'operation':<12} {'ms/call':>9} {'speedup':>8} {'efficiency':>11} {'probe':>6}  verdict",
+    ]
+    cpus = os.cpu_count() or 1
+    if threads > cpus:
+        lines.insert(1, f"Only {cpus} CPU(s) available: speedups are capped at {cpus}x")
+    for report in reports:
+        lines.append(
+            f"{report.name:<12} {report.serial_time * 1000:>9.3f} {report.speedup:>7.2f}x "
+            f"{report.efficiency:>10.0%} {report.probe_share:>6.0%}  {report.verdict}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def compare_executors(examples: Path, jobs: int, volume_tolerance: float = 1e-12) -> Dict[str, Any]:
+    """
+    Executes the examples with the thread and the pool executor and compares them.
+
+    Returns:
+        dict: Wall time of each executor, the number of bit-for-bit identical volumes, the largest
+        relative volume difference, and the examples whose status differs or whose volumes differ
+        by more than volume_tolerance (relative).
+    """
+    files = sorted(path for path in examples.glob("*.py") if path.is_file())
+    tasks = [(path.read_text(), path.name) for path in files]
+    results, wall_times = {}, {}
+    for executor in ("thread", "pool"):
+        started = time.perf_counter()
+        results[executor] = Engine(executor=executor, jobs=jobs).run(tasks)
+        wall_times[executor] = time.perf_counter() - started
+
+    identical, largest_difference, mismatches = 0, 0.0, []
+    for thread, pool in zip(results["thread"], results["pool"]):
+        if thread.status == pool.status and thread.volume == pool.volume:
+            identical += 1
+            continue
+        if thread.status == pool.status == "ok":
+            difference = abs(thread.volume - pool.volume) / max(abs(thread.volume), abs(pool.volume))
+            largest_difference = max(largest_difference, difference)
+            if math.isclose(thread.volume, pool.volume, rel_tol=volume_tolerance):
+                continue
+        mismatches.append(
+            f"{thread.name}: {thread.status} {thread.volume!r} (thread) != {pool.status} {pool.volume!r} (pool)"
+        )
+    return {
+        "examples": len(tasks),
+        "wall_time": wall_times,
+        "identical": identical,
+        "largest_relative_difference": largest_difference,
+        "mismatches": mismatches,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure which build123d operations release the GIL.")
+    parser.add_argument(
+        "-t", "--threads", type=int, default=os.cpu_count(), help="Threads to run in parallel (default: CPU count)"
+    )
+    parser.add_argument("-n", "--repeat", type=int, default=20, help="Calls per thread (default: 20)")
+    parser.add_argument("--only", help="Comma-separated operation names to measure (default: all)")
+    parser.add_argument("--examples", type=Path, help="Also compare the thread and pool executors on these examples")
+    parser.add_argument(
+        "--volume-tolerance", type=float, default=1e-12,
+        help="Relative volume difference between executors reported as a mismatch (default: 1e-12)"
+    )
+    parser.add_argument("--json", type=Path, help="Also write the measurements to this JSON file")
+    args = parser.parse_args()
+
+    selected = [
+        operation for operation in operations()
+        if args.only is None or operation.name in args.only.split(",")
+    ]
+    _probe_rate(lambda: time.sleep(0.1))  # Let the interpreter specialise the probe loop before measuring
+    reports = [measure(operation, args.threads, args.repeat) for operation in selected]
+    print(format_report(reports, args.threads), end="")
+    output: Dict[str, Any] = {"threads": args.threads, "operations": [report._asdict() for report in reports]}
+
+    if args.examples is not None:
+        comparison = compare_executors(args.examples, args.threads, args.volume_tolerance)
+        wall_time = comparison["wall_time"]
+        print(
+            f"\n{comparison['examples']} examples: thread executor {wall_time['thread']:.2f}s, "
+            f"pool executor {wall_time['pool']:.2f}s"
+        )
+        for mismatch in comparison["mismatches"]:
+            print(f"MISMATCH {mismatch}")
+        print(
+            f"{comparison['identical']} volumes identical bit for bit, largest relative difference "
+            f"{comparison['largest_relative_difference']:.1e}, {len(comparison['mismatches'])} mismatches"
+        )
+        output["executors"] = comparison
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(output, indent=2))
@@ -0,0 +1,332 @@
+"""
+Incremental re-execution of edited examples.
+
+Every example is a few imports and constants followed by one large
+`with BuildPart() as exN:` block, so snapshots taken only between top-level
+statements would never skip any modelling. Snapshots are therefore also taken
+between the statements of each top-level builder block: the block is executed
+as an explicit __enter__, its body and __exit__, and at every statement
+boundary the namespace and the active build scope are copied into a per-process
+LRU keyed by the hash of the statements executed so far. Running an edited
+example restores the snapshot of the longest unchanged prefix and executes only
+the statements from the first changed one on.
+
+Snapshots share the TShapes of the shapes they copy instead of copying the
+BREP, so faces picked from a part (e.g. `ex29.faces().sort_by(Axis.Z)[-1]`)
+remain sub-shapes of the restored part. Keys are built from the AST, so editing
+comments or blank lines keeps every snapshot valid. A boundary whose state
+cannot be copied (an open file, a builder entered by hand, ...) is simply not
+snapshotted, and the example runs from an earlier boundary.
+"""
+import ast
+import copy
+import hashlib
+import sys
+import threading
+import types
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional
+
+CONTEXT_NAME = "_incremental_context_{}"  # Namespace name of the builder of top-level block {}
+CHECKPOINT_NAME = "_incremental_checkpoint"
+RESTORE_NAME = "_incremental_restore"
+SHARED_SHAPE_ATTRIBUTES = ("topo_path", "_history")  # Provenance, kept by reference as Shape.__deepcopy__ does
+
+
+class Boundary(NamedTuple):
+    """A point between two statements where the example state can be snapshotted."""
+    key: str  # Hash of the imports and of every statement executed before this point
+    item: int  # Index of the top-level statement that follows; len(body) at the end
+    statement: Optional[int]  # Index of the following statement in that builder block; None between top-level ones
+    lineno: int  # Line of the following statement; the line after the last one at the end
+
+
+class Snapshot(NamedTuple):
+    namespace: Dict[str, Any]
+    scope: Any  # The active build123d BuildScope, None between top-level statements
+
+
+class SnapshotStore:
+    """Thread-safe LRU of snapshots with hit and miss counters."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.snapshots: "OrderedDict[str, Snapshot]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Snapshot]:
+        with self.lock:
+            snapshot = self.snapshots.get(key)
+            if snapshot is not None:
+                self.snapshots.move_to_end(key)
+            return snapshot
+
+    def put(self, key: str, snapshot: Snapshot) -> None:
+        with self.lock:
+            self.snapshots[key] = snapshot
+            self.snapshots.move_to_end(key)
+            while len(self.snapshots) > self.maxsize:
+                self.snapshots.popitem(last=False)
+
+    def __contains__(self, key: str) -> bool:
+        with self.lock:
+            return key in self.snapshots
+
+    def count(self, counter: str) -> None:
+        """Increments the hits or misses counter."""
+        with self.lock:  # += is not atomic, and the thread executor runs examples concurrently
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+_store: Optional[SnapshotStore] = None
+_install_lock = threading.Lock()  # Serializes install(), so concurrent callers patch Shape and create the store once
+_sharing = threading.local()  # Set while snapshotting, so Shape.__deepcopy__ shares TShapes
+
+
+def _build_common():
+    import build123d.build_common
+    return build123d.build_common
+
+
+def _shared_deepcopy(deepcopy):
+    """
+    Wraps Shape.__deepcopy__ so that, while snapshotting, copies are new handles on the same TShape.
+    """
+    from build123d.topology import downcast
+
+    def __deepcopy__(self, memo):
+        if not getattr(_sharing, "active", False):
+            return deepcopy(self, memo)
+        clone = self.__class__.__new__(self.__class__)
+        memo[id(self)] = clone
+        wrapped = self.wrapped
+        if wrapped is not None and id(wrapped) not in memo:
+            memo[id(wrapped)] = downcast(wrapped.Located(wrapped.Location()))
+        for key, value in self.__dict__.items():
+            setattr(clone, key, value if key in SHARED_SHAPE_ATTRIBUTES else copy.deepcopy(value, memo))
+        return clone
+
+    __deepcopy__.__wrapped__ = deepcopy
+    return __deepcopy__
+
+
+def install(maxsize: int) -> SnapshotStore:
+    """
+    Keeps up to maxsize snapshots in this process and returns the store.
+    Installing again keeps the snapshots and only changes the bound.
+    """
+    global _store
+    with _install_lock:
+        if _store is None:
+            build_common = _build_common()
+            if not all(hasattr(build_common, name) for name in ("_get_build_scope", "_build_scope_context")):
+                raise RuntimeError(
+                    "Incremental execution needs build123d's BuildScope, which this build123d does not have"
+                )
+            from build123d.topology import Shape
+
+            if getattr(Shape.__deepcopy__, "__wrapped__", None) is None:
+                Shape.__deepcopy__ = _shared_deepcopy(Shape.__deepcopy__)
+            _store = SnapshotStore(maxsize)
+        with _store.lock:
+            _store.maxsize = maxsize
+        return _store
+
+
+def _is_block(statement: ast.stmt) -> bool:
+    return isinstance(statement, ast.With) and len(statement.items) == 1
+
+
+def boundaries(body: ast.Module, context: str = "") -> List[Boundary]:
+    """
+    Returns the boundaries of body in execution order, keyed by context (what ran before body) and
+    the statements before each boundary.
+    """
+    digest = hashlib.sha256(context.encode())
+    result = []
+
+    def add(item, statement, lineno):
+        result.append(Boundary(digest.copy().hexdigest(), item, statement, lineno))
+
+    for item, top_level in enumerate(body.body):
+        add(item, None, top_level.lineno)
+        if _is_block(top_level):
+            digest.update(ast.dump(top_level.items[0]).encode() + b"\0")
+            for index, statement in enumerate(top_level.body):
+                add(item, index, statement.lineno)
+                digest.update(ast.dump(statement).encode() + b"\0")
+            digest.update(b"exit\0")
+        else:
+            digest.update(ast.dump(top_level).encode() + b"\0")
+    add(len(body.body), None, body.body[-1].end_lineno + 1 if body.body else 1)
+    return result
+
+
+def _generated(source: str, origin: ast.AST) -> List[ast.stmt]:
+    """
+    Parses source into statements that report the line of origin (a node, or the module for line 1) in tracebacks.
+    """
+    lineno, col_offset = getattr(origin, "lineno", 1), getattr(origin, "col_offset", 0)
+    statements = ast.parse(source).body
+    for statement in statements:
+        for node in ast.walk(statement):
+            if "lineno" in node._attributes:
+                node.lineno = node.end_lineno = lineno
+                node.col_offset = node.end_col_offset = col_offset
+    return statements
+
+
+def _program(body: ast.Module, marks: List[Boundary], start: int) -> ast.Module:
+    """
+    Returns body, from boundary start on, with every top-level builder block flattened into an explicit
+    __enter__ and __exit__ and a checkpoint call at every boundary.
+    """
+    index = {(mark.item, mark.statement): position for position, mark in enumerate(marks)}
+    first = marks[start]
+    statements = []
+    if start > 0:
+        statements += _generated(f"{RESTORE_NAME}()", body.body[first.item] if first.item < len(body.body) else body)
+
+    def checkpoint(item, statement, origin):
+        return _generated(f"{CHECKPOINT_NAME}({index[item, statement]})", origin)
+
+    for item in range(first.item, len(body.body)):
+        top_level = body.body[item]
+        resuming_inside = item == first.item and first.statement is not None
+        if not resuming_inside:
+            statements += checkpoint(item, None, top_level)
+        if not _is_block(top_level):
+            statements.append(top_level)
+            continue
+
+        context = CONTEXT_NAME.format(item)
+        if not resuming_inside:
+            with_item = top_level.items[0]
+            statements.append(ast.copy_location(
+                ast.Assign([ast.Name(context, ast.Store())], with_item.context_expr), top_level
+            ))
+            entered = ast.parse(f"{context}.__enter__()", mode="eval").body
+            ast.copy_location(entered, top_level)
+            if with_item.optional_vars is not None:
+                statements.append(ast.copy_location(ast.Assign([with_item.optional_vars], entered), top_level))
+            else:
+                statements.append(ast.copy_location(ast.Expr(entered), top_level))
+        block = _generated(
+            "try:\n"
+            "    pass\n"
+            "except BaseException as _incremental_error:\n"
+            f"    if not {context}.__exit__(type(_incremental_error), _incremental_error, "
+            "_incremental_error.__traceback__):\n"
+            "        raise\n"
+            "else:\n"
+            f"    {context}.__exit__(None, None, None)\n",
+            top_level,
+        )[0]
+        block.body = []
+        for statement in range(first.statement if resuming_inside else 0, len(top_level.body)):
+            block.body += checkpoint(item, statement, top_level.body[statement])
+            block.body.append(top_level.body[statement])
+        if not block.body:
+            block.body = [ast.copy_location(ast.Pass(), top_level)]
+        statements.append(block)
+    statements += checkpoint(len(body.body), None, body.body[-1] if body.body else body)
+    return ast.fix_missing_locations(ast.Module(statements, type_ignores=[]))
+
+
+def _copy(snapshot: Snapshot, shared: Dict[int, Any]) -> Snapshot:
+    """
+    Deep-copies a snapshot, keeping the objects in shared (the imported names) and Python frames by reference.
+    The copied builders have no active scope context; restoring a snapshot gives them a new one.
+    """
+    memo = dict(shared)
+    builders = list(snapshot.namespace.values())
+    if snapshot.scope is not None:
+        builders.append(snapshot.scope.builder)
+    for value in builders:
+        for name, attribute in getattr(value, "__dict__", {}).items():
+            if isinstance(attribute, types.FrameType):
+                memo[id(attribute)] = attribute
+            elif name == "_scope_context":
+                memo[id(attribute)] = None
+    _sharing.active = True
+    try:
+        return copy.deepcopy(snapshot, memo)
+    finally:
+        _sharing.active = False
+
+
+def execute(body: ast.Module, name: str, namespace: Dict[str, Any], context: str = "") -> Dict[str, Any]:
+    """
+    Executes body in namespace like exec(), resuming from the latest snapshot of an unchanged prefix
+    and snapshotting every boundary that is not in the store yet. install() must have been called.
+
+    Args:
+        body (ast.Module): The example without the imports that already ran in namespace.
+        name (str): File name used in tracebacks.
+        namespace (dict): Namespace of the example, holding what the imports bound.
+        context (str): Identifies what ran before body, e.g. ast.dump() of the imports.
+
+    Returns:
+        dict: resumed_line, the line execution resumed at (None for a full run), skipped, the number of
+        statements skipped, and snapshots, the number of snapshots taken.
+    """
+    store = _store
+    build_common = _build_common()
+    marks = boundaries(body, context)
+    shared = {id(value): value for value in namespace.values()}
+    builtins = namespace.get("__builtins__")
+    stats: Dict[str, Any] = {"resumed_line": None, "skipped": 0, "snapshots": 0}
+
+    start, restored = 0, None
+    for position in range(len(marks) - 1, 0, -1):
+        snapshot = store.get(marks[position].key)
+        if snapshot is not None:
+            start, restored = position, _copy(snapshot, shared)
+            break
+    if restored is None:
+        store.count("misses")
+    else:
+        store.count("hits")
+        namespace.update(restored.namespace)
+        namespace["__file__"] = name
+        stats.update(resumed_line=marks[start].lineno, skipped=start)
+
+    def restore():
+        if restored.scope is None:
+            return
+        builder = restored.scope.builder
+        builder._python_frame = sys._getframe(1)  # Lets nested builders find the builder they are in
+        builder._scope_context = build_common._build_scope_context(restored.scope)
+        builder._scope_context.__enter__()
+
+    def checkpoint(position):
+        mark = marks[position]
+        if position == 0 or mark.key in store:
+            return
+        scope = build_common._get_build_scope()
+        if mark.statement is None:
+            if scope is not None:
+                return
+        elif scope is None or scope.parent is not None or scope.builder is not namespace.get(
+            CONTEXT_NAME.format(mark.item)
+        ):
+            return  # Only the top-level builder may be active, or the snapshot could not be resumed
+        state = {
+            key: value for key, value in namespace.items()
+            if key not in ("__builtins__", CHECKPOINT_NAME, RESTORE_NAME)
+        }
+        try:
+            snapshot = _copy(Snapshot(state, scope), shared)
+        except Exception:
+            return  # Not copyable; an earlier boundary will be resumed from instead
+        store.put(mark.key, snapshot)
+        stats["snapshots"] += 1
+
+    namespace[CHECKPOINT_NAME] = checkpoint
+    namespace[RESTORE_NAME] = restore
+    if builtins is not None:
+        namespace["__builtins__"] = builtins
+    exec(compile(_program(body, marks, start), name, "exec"), namespace)
+    return stats
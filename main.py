@@ -32,25 +32,62 @@ def extract_examples(input_file: Path, output_dir: Path) -> None:
     if not input_file.is_file():
         raise ValueError(f"Input path '{input_file}' is not a file.")
 
-    # Read the content of the input file
-    content: str = input_file.read_text()
-
-    # Split the content into individual examples using the delimiter "##########"
-    examples: List[str] = re.split(r'#{3,}\n', content)
-
-    # Filter out any empty strings from the split operation
-    examples = [example.strip() for example in examples if example.strip()]
+    # Read the content of the input file and split it into examples
+    examples: List[str] = split_examples(input_file.read_text())
 
     # Process each example
     for i, example in enumerate(examples, start=1):
         # Generate the filename for the example
-        filename: str = f"example-{i:02d}.py"
+        filename: str = example_filename(i)
 
         # Write the example to its own file in the output directory
         (output_dir / filename).write_text(example)
 
         print(f"Created {filename}")
 
+def split_examples(content: str) -> List[str]:
+    """
+    Splits the corpus into examples on lines of three or more '#' characters.
+    """
+    # Split the content into individual examples using the delimiter "##########"
+    examples: List[str] = re.split(r'#{3,}\n', content)
+
+    # Filter out any empty strings from the split operation
+    return [example.strip() for example in examples if example.strip()]
+
+def example_filename(i: int) -> str:
+    return f"example-{i:02d}.py"
+
+def sync_examples(input_file: Path, output_dir: Path) -> List[str]:
+    """
+    Re-splits the corpus into an existing output directory, touching only what changed.
+
+    Examples whose text is unchanged keep their file (and modification time), changed
+    or new examples are rewritten, and files of examples that no longer exist are removed.
+
+    Args:
+        input_file (Path): The corpus, e.g. general_examples5.py.
+        output_dir (Path): The examples directory, created if missing.
+
+    Returns:
+        List[str]: Names of the files written or removed.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    examples: List[str] = split_examples(input_file.read_text())
+    wanted = {example_filename(i): example for i, example in enumerate(examples, start=1)}
+
+    touched: List[str] = []
+    for filename, example in wanted.items():
+        path = output_dir / filename
+        if not path.is_file() or path.read_text() != example:
+            path.write_text(example)
+            touched.append(filename)
+    for path in sorted(output_dir.glob("example-*.py")):
+        if path.name not in wanted:
+            path.unlink()
+            touched.append(path.name)
+    return touched
+
 if __name__ == "__main__":
     # Set up argument parsing
     parser = argparse.ArgumentParser(description="Extract examples from a Python source file into separate files.")
@@ -1,16 +1,48 @@
+import argparse
+import importlib
+import importlib.util
+import os
 import pathlib
 import shutil
-import subprocess
-import sys
+import time
 
-def process_python_files(input_dir_path_str, output_dir_path_str):
+from artifacts import DEFAULT_ARTIFACT_DIR, DEFAULT_STL_TOLERANCE, EXPORT_FORMATS, ArtifactStore, export_stored
+from concatfiles import rewrite_output
+from engine import EXECUTORS, Engine, run_subprocess
+from execution import Limits, RunOptions
+from main import sync_examples
+from part_properties import DEFAULT_VOLUME_TOLERANCE, PROPERTY_NAMES, VOLUME_PRECISIONS
+from post_processors import (
+    MESH_CHECK_TOLERANCE, POST_PROCESSORS, PRECISE_MESH_CHECK_TOLERANCE, annotated_source, link_exports,
+    stl_tolerance,
+)
+from profiling import write_report
+from results_db import DEFAULT_DATABASE, ResultsDatabase, source_hash
+from result_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, ResultCache
+from scheduler import DEFAULT_HISTORY_FILE, RuntimeHistory
+from telemetry import TELEMETRY_FILE_NAME, telemetry_record, write_telemetry
+from worker_pool import RecyclePolicy
+
+def process_python_files(input_dir_path_str, output_dir_path_str, engine=None, database=None):
     """
     Processes python files in the input directory, creating modified copies in the output directory.
 
+    Examples are executed concurrently, and each annotated copy is written, with a
+    progress line on the console, as soon as its result is in. Per-example timings and
+    memory use are written to telemetry.jsonl in the output directory at the end.
+
+    With a results database, every result is recorded there first and the annotated
+    copies are rendered from the database.
+
     Args:
         input_dir_path_str (str): Path to the input directory.
         output_dir_path_str (str): Path to the output directory.
+        engine (Engine): Executes the examples and applies the post-processors (default: Engine()).
+            With options.profile_dir set, a hotspot report is printed at the end.
+        database (ResultsDatabase): Record results and render the annotated copies from it (default: none).
     """
+    engine = engine or Engine()
+    options = engine.options
 
     input_dir = pathlib.Path(input_dir_path_str)
     output_dir = pathlib.Path(output_dir_path_str)
@@ -20,58 +52,447 @@ def process_python_files(input_dir_path_str, output_dir_path_str):
         shutil.rmtree(output_dir)  # Remove directory and all contents
     output_dir.mkdir(parents=True)  # Create directory and any necessary parents
 
-    for input_file in input_dir.glob("*.py"):
-        if input_file.is_file():
-            process_file(input_file, output_dir)
+    input_files = sorted(input_file for input_file in input_dir.glob("*.py") if input_file.is_file())
+    sources = [input_file.read_text() for input_file in input_files]
 
-def process_file(input_file, output_dir):
+    results = execute_files(input_files, sources, output_dir, engine, database)
+    if engine.cache is not None:
+        reused = sum(result.cached for result in results)
+        print(f"Reused {reused} cached results, executed {len(results) - reused} examples.")
+
+    write_telemetry(output_dir / TELEMETRY_FILE_NAME, (telemetry_record(result) for result in results))
+
+    if options.profile_dir is not None:
+        print(write_report(options.profile_dir), end="")
+
+def execute_files(input_files, sources, output_dir, engine, database=None):
     """
-    Processes a single python file.
+    Runs the given example files through the engine, writing each annotated copy and a
+    progress line as soon as its result is in.
 
     Args:
-        input_file (pathlib.Path): Path to the input python file.
-        output_dir (pathlib.Path): Path to the output directory.
+        input_files (list[pathlib.Path]): The example files.
+        sources (list[str]): Their sources.
+        output_dir (pathlib.Path): Directory for the annotated copies.
+        engine (Engine): Executes the examples.
+        database (ResultsDatabase): Record results and render the annotated copies from it (default: none).
+
+    Returns:
+        list[ExampleResult]: One result per file.
     """
-    output_file_original = output_dir / input_file.name
-    output_file_temp = output_dir / (input_file.stem + "_temp.py")
+    properties_wanted = engine.options.properties
+    completed = 0
 
-    # Copy to _temp and original filenames
-    shutil.copy2(input_file, output_file_temp) # copy2 to preserve metadata
-    shutil.copy2(input_file, output_file_original)
+    def write_result(index, result):
+        # Stream each result to disk and the console as soon as it is available
+        nonlocal completed
+        completed += 1
+        input_file, source = input_files[index], sources[index]
+        state = "cached" if result.cached else f"{result.status} in {result.wall_time:.2f}s"
+        resumed_line = ((result.outputs or {}).get("incremental") or {}).get("resumed_line")
+        if resumed_line is not None:
+            state += f" (resumed at line {resumed_line})"
+        print(f"[{completed}/{len(input_files)}] {input_file.name}: {state}", flush=True)
+        if result.status != "ok":
+            print(f"Error running {input_file}:")
+            print(result.message)
+        disagreements = ((result.outputs or {}).get("mesh_check") or {}).get("disagreements")
+        if disagreements:
+            print(f"Mesh check of {input_file.name}: {', '.join(disagreements)} disagree with the kernel")
+        if database is not None:
+            database.record(source, result)
+            database.render(output_dir, [input_file.stem], properties_wanted)
+        else:
+            properties = {name: value for name, value in (result.properties or {}).items() if name in properties_wanted}
+            write_annotated_file(output_dir / input_file.name, source, result.volume_text(), properties)
 
-    # Append print statement to _temp file
-    with open(output_file_temp, "a") as f_temp:
-        f_temp.write("\nprint(part.volume)\n")
+    results = engine.run(
+        [(source, input_file.name) for input_file, source in zip(input_files, sources)], on_result=write_result
+    )
+    if "export" in engine.options.post_processors:
+        export_cached_results(input_files, sources, results, engine.options, engine.jobs)
+    return results
 
-    # Run the _temp file and capture output
+def export_cached_results(input_files, sources, results, options, jobs):
+    """
+    Exports the parts of cached results, whose examples were not executed, from the artifact store.
+
+    Only exports missing from the store are written, in up to jobs worker processes, so the parts
+    of unchanged examples are normally not even loaded.
+
+    Args:
+        input_files (list[pathlib.Path]): The example files.
+        sources (list[str]): Their sources.
+        results (list[ExampleResult]): Their results.
+        options (RunOptions): Formats, export directory and artifact store of the run.
+        jobs (int): Number of worker processes.
+    """
+    store = ArtifactStore(options.artifact_dir or DEFAULT_ARTIFACT_DIR)
+    cached = [
+        (input_file, source_hash(source))
+        for input_file, source, result in zip(input_files, sources, results)
+        if result.cached and result.status == "ok"
+    ]
+    stl_tolerances = {digest: stl_tolerance(options, input_file.name) for input_file, digest in cached}
+    exported = export_stored(store, [digest for _, digest in cached], options.export_formats, jobs, stl_tolerances)
+    for input_file, digest in cached:
+        if exported[digest] is None:
+            print(f"Cannot export {input_file.name}: its part is not in {store.directory}; run it with --no-cache")
+        elif options.export_dir is not None:
+            link_exports(exported[digest], pathlib.Path(options.export_dir), input_file.stem)
+
+def watch_python_files(input_dir_path_str, output_dir_path_str, corpus=None, final_file=None, engine=None,
+                       database=None, interval=0.5):
+    """
+    Processes all python files once, then keeps the output up to date until interrupted.
+
+    Every interval seconds the corpus is re-split into the input directory (only changed
+    examples are rewritten) and the input directory is scanned; only the examples whose
+    content changed are executed again and re-annotated, annotated copies of deleted
+    examples are removed, and the final file is rewritten from the output directory.
+
+    Args:
+        input_dir_path_str (str): Path to the input directory.
+        output_dir_path_str (str): Path to the output directory.
+        corpus (pathlib.Path): Source file the examples are split from, e.g. general_examples5.py (default: none).
+        final_file (pathlib.Path): Concatenation of the annotated copies to keep up to date, e.g. examples_final.py
+            (default: none).
+        engine (Engine): Executes the examples; use it as a context manager to keep pool workers warm between runs.
+        database (ResultsDatabase): Record results and render the annotated copies from it (default: none).
+        interval (float): Seconds between checks for changes.
+    """
+    engine = engine or Engine()
+    input_dir = pathlib.Path(input_dir_path_str)
+    output_dir = pathlib.Path(output_dir_path_str)
+
+    if corpus is not None:
+        sync_examples(corpus, input_dir)
+    process_python_files(input_dir, output_dir, engine, database)
+    if final_file is not None:
+        rewrite_output(output_dir, final_file)
+
+    def stamp(path):
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    corpus_stamp = stamp(corpus) if corpus is not None else None
+    stamps = {input_file: stamp(input_file) for input_file in input_dir.glob("*.py") if input_file.is_file()}
+    print(f"Watching {corpus or input_dir} for changes; press Ctrl+C to stop.")
     try:
-        result = subprocess.run(
-            [sys.executable, str(output_file_temp)], # Use sys.executable to ensure correct python interpreter
-            capture_output=True,
-            text=True,
-            check=True # Raise exception for non-zero exit codes
-        )
-        captured_output = result.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        print(f"Error running {output_file_temp}:")
-        print(e.stderr) # Print standard error if the script failed
-        captured_output = "Error during execution" # Or handle error as needed
-
-    # Modify the original file to add the comment
-    with open(output_file_original, "a") as f_original:
-        f_original.write(f"\n# Volume: {captured_output} mm^3\n")
-
-    # Delete the _temp file
-    output_file_temp.unlink()
+        while True:
+            time.sleep(interval)
+            if corpus is not None and corpus.exists() and stamp(corpus) != corpus_stamp:
+                corpus_stamp = stamp(corpus)
+                sync_examples(corpus, input_dir)
 
-if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python script_name.py <input_directory> <output_directory>")
-        sys.exit(1)
+            current = {input_file: stamp(input_file) for input_file in input_dir.glob("*.py") if input_file.is_file()}
+            changed = sorted(input_file for input_file, value in current.items() if stamps.get(input_file) != value)
+            removed = [input_file for input_file in stamps if input_file not in current]
+            stamps = current
+            if not changed and not removed:
+                continue
+
+            started = time.monotonic()
+            for input_file in removed:
+                (output_dir / input_file.name).unlink(missing_ok=True)
+            sources = [input_file.read_text() for input_file in changed]
+            execute_files(changed, sources, output_dir, engine, database)
+            if final_file is not None:
+                rewrite_output(output_dir, final_file)
+            print(f"Updated {len(changed)} and removed {len(removed)} examples in {time.monotonic() - started:.2f}s.")
+    except KeyboardInterrupt:
+        pass
+
+def write_annotated_file(output_file, source, captured_output, properties=None):
+    """
+    Writes the example source with a trailing volume comment in a single write.
+
+    Args:
+        output_file (pathlib.Path): Path of the annotated copy.
+        source (str): Source of the example.
+        captured_output (str): Volume text to record in the comment.
+        properties (dict): Measured part properties; each one other than the volume
+            gets its own comment line after the volume.
+    """
+    output_file.write_text(annotated_source(source, captured_output, properties))
 
-    input_directory = sys.argv[1]
-    output_directory = sys.argv[2]
+def process_file(input_file, output_dir):
+    """
+    Processes a single python file.
 
-    process_python_files(input_directory, output_directory)
-    print(f"Processed python files from '{input_directory}' to '{output_directory}'.")
+    Args:
+        input_file (pathlib.Path): Path to the input python file.
+        output_dir (pathlib.Path): Path to the output directory.
+    """
+    source = input_file.read_text()
+    result = run_subprocess(source, input_file.name)
+    if result.status != "ok":
+        print(f"Error running {input_file}:")
+        print(result.message) # Print standard error if the script failed
+    write_annotated_file(output_dir / input_file.name, source, result.volume_text())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Execute build123d examples and record their volume.")
+    parser.add_argument("input_directory", help="Directory containing the example files")
+    parser.add_argument("output_directory", help="Directory for the annotated copies (recreated on every run)")
+    parser.add_argument(
+        "--executor",
+        choices=EXECUTORS,
+        default="subprocess",
+        help="subprocess: new interpreter per example; pool: warm worker processes that import build123d once; "
+             "inline: execute in this process and read part directly; thread: execute on threads in this process, "
+             "without resource limits (default: subprocess)"
+    )
+    parser.add_argument(
+        "--pool",
+        dest="executor",
+        action="store_const",
+        const="pool",
+        help="Shorthand for --executor pool"
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of examples to execute concurrently (default: CPU count)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Execute every example even if a cached result exists for its source"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=pathlib.Path,
+        default=DEFAULT_CACHE_DIR,
+        help=f"Directory of the result cache (default: {DEFAULT_CACHE_DIR})"
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="Maximum size of the result cache in MiB; least recently used entries are evicted (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help="Wall-clock limit per example in seconds, counted from the end of its leading imports; slower "
+             "examples are recorded as timeout. Not enforced by the thread executor, and only between Python "
+             "bytecodes by the inline executor"
+    )
+    parser.add_argument(
+        "--max-rss",
+        type=float,
+        help="Resident memory limit per executing process in MiB (Linux only); larger examples are recorded as oom"
+    )
+    parser.add_argument(
+        "--max-address-space",
+        type=int,
+        help="Address-space limit (RLIMIT_AS) per executing process in MiB; not applied by the inline executor"
+    )
+    parser.add_argument(
+        "--recycle-after",
+        type=int,
+        help="With --executor pool, replace a worker after it has executed this many examples"
+    )
+    parser.add_argument(
+        "--recycle-rss",
+        type=float,
+        help="With --executor pool, replace a worker once its resident memory after an example exceeds this many MiB"
+    )
+    parser.add_argument(
+        "--memoize",
+        type=int,
+        default=0,
+        metavar="ENTRIES",
+        help="Memoize deterministic build123d kernel operations in an LRU of this many entries, shared by the "
+             "examples a process executes (pays off with --executor pool, inline or thread; default: off)"
+    )
+    parser.add_argument(
+        "--incremental",
+        type=int,
+        default=0,
+        metavar="SNAPSHOTS",
+        help="Snapshot every example between its statements, keeping this many snapshots per process, and resume "
+             "an edited example after its last unchanged statement (pays off with --watch and --executor inline, "
+             "thread or pool; default: off)"
+    )
+    parser.add_argument(
+        "--runtime-history",
+        type=pathlib.Path,
+        default=DEFAULT_HISTORY_FILE,
+        help=f"File of recorded build times used to start the slowest examples first (default: {DEFAULT_HISTORY_FILE})"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Execute every example under cProfile, keep <output>/profiles/<example>.pstats "
+             "and print the build123d entry points ranked by time"
+    )
+    parser.add_argument(
+        "--properties",
+        type=lambda value: tuple(value.split(",")),
+        default=("volume",),
+        help=f"Comma-separated part properties to measure in the same execution: {', '.join(PROPERTY_NAMES)} "
+             "(default: volume)"
+    )
+    parser.add_argument(
+        "--volume-precision",
+        choices=VOLUME_PRECISIONS,
+        default="default",
+        help="default: the kernel's fixed-order integration, without an error estimate; fast: Gauss-Kronrod "
+             "integration with an error estimate, coarse first and refined only where the estimate exceeds "
+             "--volume-tolerance; exact: Gauss-Kronrod integration to a tight tolerance (default: default)"
+    )
+    parser.add_argument(
+        "--volume-tolerance",
+        type=float,
+        default=DEFAULT_VOLUME_TOLERANCE,
+        help="With --volume-precision fast, estimated relative error above which a volume is integrated again "
+             "(default: %(default)s)"
+    )
+    parser.add_argument(
+        "--database",
+        type=pathlib.Path,
+        default=DEFAULT_DATABASE,
+        help=f"SQLite results database the annotated copies are rendered from (default: {DEFAULT_DATABASE})"
+    )
+    parser.add_argument(
+        "--post-process",
+        type=lambda value: tuple(value.split(",")),
+        default=(),
+        help="Comma-separated post-processors to run on every part in the same execution, e.g. validity,export "
+             f"(built in: {', '.join(name for name in POST_PROCESSORS if name != 'properties')})"
+    )
+    parser.add_argument(
+        "--plugin",
+        dest="plugins",
+        action="append",
+        default=[],
+        help="Module that registers additional post-processors; may be given more than once"
+    )
+    parser.add_argument(
+        "--export",
+        action="store_true",
+        help="Shorthand for adding the export post-processor, which exports every part into the artifact store "
+             "in the worker that executed it; unchanged examples are exported from their stored part, only once"
+    )
+    parser.add_argument(
+        "--export-dir",
+        help="Also make the exports available as <example>.<format> in this directory (default: artifact store only)"
+    )
+    parser.add_argument(
+        "--export-formats",
+        type=lambda value: tuple(value.split(",")),
+        default=EXPORT_FORMATS,
+        help=f"Comma-separated formats for the export post-processor (default: {','.join(EXPORT_FORMATS)})"
+    )
+    parser.add_argument(
+        "--stl-tolerance",
+        dest="stl_tolerances",
+        action="append",
+        default=[],
+        metavar="[EXAMPLE=]MM",
+        help=f"Mesh deflection of STL exports in mm, for all examples or, as e.g. example-29=0.001, for one; "
+             f"may be given more than once (default: {DEFAULT_STL_TOLERANCE})"
+    )
+    parser.add_argument(
+        "--mesh-tolerance",
+        type=float,
+        help="Mesh deflection in mm for the mesh_check post-processor, which needs numpy (default: "
+             f"{MESH_CHECK_TOLERANCE}, or {PRECISE_MESH_CHECK_TOLERANCE} with a fast or exact --volume-precision)"
+    )
+    parser.add_argument(
+        "--no-artifacts",
+        action="store_true",
+        help="Do not store the part of every executed example as binary BREP in the artifact store"
+    )
+    parser.add_argument(
+        "--artifact-dir",
+        type=pathlib.Path,
+        default=DEFAULT_ARTIFACT_DIR,
+        help=f"Content-addressed store of BREP artifacts, keyed by source hash (default: {DEFAULT_ARTIFACT_DIR})"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="After processing, keep running and re-execute only the examples that change; "
+             "fastest with --executor pool, whose workers stay warm between changes"
+    )
+    parser.add_argument(
+        "--corpus",
+        type=pathlib.Path,
+        help="With --watch, also re-split this file (e.g. general_examples5.py) into the input directory on every save"
+    )
+    parser.add_argument(
+        "--final-file",
+        type=pathlib.Path,
+        default=pathlib.Path("examples_final.py"),
+        help="With --watch, file rewritten from the annotated copies after every change (default: examples_final.py)"
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.5,
+        help="With --watch, seconds between checks for changes (default: %(default)s)"
+    )
+    args = parser.parse_args()
+    unknown = set(args.properties) - set(PROPERTY_NAMES)
+    if unknown:
+        parser.error(f"unknown properties: {', '.join(sorted(unknown))}")
+    for plugin in args.plugins:
+        importlib.import_module(plugin)  # Registers its post-processors so they can be validated here
+    unknown = set(args.post_process) - set(POST_PROCESSORS)
+    if unknown:
+        parser.error(f"unknown post-processors: {', '.join(sorted(unknown))}")
+    if args.export:
+        args.post_process = tuple(dict.fromkeys((*args.post_process, "export")))
+    unknown = set(args.export_formats) - set(EXPORT_FORMATS)
+    if unknown:
+        parser.error(f"unknown export formats: {', '.join(sorted(unknown))}")
+    stl_tolerances = {}
+    for value in args.stl_tolerances:
+        example, _, tolerance = value.rpartition("=")
+        try:
+            stl_tolerances[example] = float(tolerance)
+        except ValueError:
+            parser.error(f"invalid --stl-tolerance '{value}', expected MM or EXAMPLE=MM")
+    if "mesh_check" in args.post_process and importlib.util.find_spec("numpy") is None:
+        parser.error("the mesh_check post-processor needs numpy: pip install geminiscript[mesh]")
 
+    cache = None if args.no_cache else ResultCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    profile_dir = str(pathlib.Path(args.output_directory) / "profiles") if args.profile else None
+    post_processors = args.post_process if args.no_artifacts else tuple(dict.fromkeys(("artifact", *args.post_process)))
+    engine = Engine(
+        executor=args.executor,
+        jobs=args.jobs,
+        limits=Limits(args.timeout, args.max_rss, args.max_address_space),
+        options=RunOptions(
+            profile_dir=profile_dir,
+            properties=args.properties,
+            volume_precision=args.volume_precision,
+            volume_tolerance=args.volume_tolerance,
+            post_processors=post_processors,
+            plugins=tuple(args.plugins),
+            export_dir=args.export_dir,
+            export_formats=args.export_formats,
+            stl_tolerance=stl_tolerances.pop("", None),
+            stl_tolerances=tuple(stl_tolerances.items()),
+            mesh_tolerance=args.mesh_tolerance,
+            artifact_dir=str(args.artifact_dir),
+            memoize=args.memoize,
+            incremental=args.incremental,
+        ),
+        cache=cache,
+        history=RuntimeHistory(args.runtime_history),
+        recycle=RecyclePolicy(args.recycle_after, args.recycle_rss),
+    )
+    with ResultsDatabase(args.database) as database, engine:
+        if args.watch:
+            watch_python_files(
+                args.input_directory, args.output_directory, corpus=args.corpus, final_file=args.final_file,
+                engine=engine, database=database, interval=args.interval
+            )
+        else:
+            process_python_files(args.input_directory, args.output_directory, engine=engine, database=database)
+    print(f"Processed python files from '{args.input_directory}' to '{args.output_directory}'.")
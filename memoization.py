@@ -0,0 +1,225 @@
+"""
+Opt-in memoization of deterministic build123d kernel operations.
+
+Examples in the corpus rebuild the same geometry over and over: the same
+80x60x10 box, the same circle sketch, the same holes. With memoization
+installed, the topology-level constructors and operations that the builders
+call (Solid.make_box, Wire.make_circle, Shape.fuse/cut, fillet, ...) are cached
+in an LRU keyed by their arguments and the hashes of their input shapes, so
+every worker process that executes several examples skips kernel work it has
+already done. Hooking below the builders makes it work in builder mode too,
+because a builder adds the (cached) result to its context exactly as before.
+
+Input shapes are kept alive by the cache entry and verified with IsEqual on
+every hit, so a hash collision or a reused address can never return the result
+of a different input. Results are handed out as new handles on the cached
+TShape, so moving or relabelling a returned shape does not affect the cache.
+"""
+import copy
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+# build123d.topology class name -> methods that only depend on their arguments
+MEMOIZED_METHODS: Dict[str, Tuple[str, ...]] = {
+    "Shape": ("fuse", "cut", "intersect", "clean"),
+    "Mixin3D": ("fillet", "chamfer"),
+    "Solid": (
+        "make_box", "make_cone", "make_cylinder", "make_sphere", "make_torus", "make_wedge",
+        "extrude", "extrude_taper", "revolve", "sweep", "make_loft",
+    ),
+    "Face": ("make_rect", "make_from_wires", "fillet_2d", "chamfer_2d"),
+    "Wire": ("make_circle", "make_ellipse", "make_rect", "make_polygon", "combine"),
+    "Edge": ("make_circle", "make_ellipse", "make_line", "make_spline", "make_three_point_arc"),
+}
+PRIMITIVES = (bool, int, float, str, bytes, type(None))
+
+
+class _Unmemoizable(Exception):
+    """An argument cannot be part of a cache key, so the call is passed through."""
+
+
+class _Entry:
+    __slots__ = ("inputs", "result", "in_place")
+
+    def __init__(self, inputs: List[Any], result: Any, in_place: bool) -> None:
+        self.inputs = inputs  # Non-primitive arguments, kept alive and compared on every hit
+        self.result = result
+        self.in_place = in_place  # The method returned self after replacing self.wrapped
+
+
+class Memo:
+    """Thread-safe LRU of operation results with hit and miss counters."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def get(self, key: Hashable) -> Optional[_Entry]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, entry: _Entry) -> None:
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def count(self, counter: str) -> None:
+        """Increments the hits, misses or bypassed counter."""
+        with self.lock:  # += is not atomic, and the thread executor runs examples concurrently
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "bypassed": self.bypassed, "entries": len(self.entries)}
+
+
+_memo: Optional[Memo] = None
+_install_lock = threading.Lock()  # Serializes install(), so concurrent callers patch the classes once
+
+
+def _topology():
+    import build123d
+    return getattr(build123d, "topology", build123d)
+
+
+def _key(value: Any, inputs: List[Any]) -> Hashable:
+    """
+    Returns a hashable key for an argument, appending the objects that must be verified on a hit to inputs.
+    """
+    if isinstance(value, PRIMITIVES):
+        return type(value).__name__, value
+    if isinstance(value, _topology().Shape):
+        inputs.append(value)
+        return "shape", type(value).__name__, None if value.wrapped is None else hash(value)
+    if isinstance(value, (list, tuple)):
+        return type(value).__name__, tuple(_key(item, inputs) for item in value)
+    if isinstance(value, dict):
+        return "dict", tuple(sorted((name, _key(item, inputs)) for name, item in value.items()))
+    try:
+        hash(value)
+    except TypeError:
+        raise _Unmemoizable() from None
+    inputs.append(value)
+    return type(value).__name__, value
+
+
+def _same(stored: List[Any], current: List[Any]) -> bool:
+    if len(stored) != len(current):
+        return False
+    shape_type = _topology().Shape
+    for old, new in zip(stored, current):
+        if isinstance(old, shape_type):
+            if old.wrapped is None or new.wrapped is None:
+                if old.wrapped is not new.wrapped:
+                    return False
+            elif not old.wrapped.IsEqual(new.wrapped):  # Same TShape, location and orientation
+                return False
+        elif old is not new and old != new:
+            return False
+    return True
+
+
+def _handle(value: Any) -> Any:
+    """
+    Returns value with every shape replaced by a new handle on the same TShape and location.
+    """
+    topology = _topology()
+    if isinstance(value, topology.Shape):
+        if value.wrapped is None:
+            return copy.copy(value)
+        clone = copy.copy(value)
+        clone.wrapped = topology.downcast(value.wrapped.Located(value.wrapped.Location()))
+        return clone
+    if isinstance(value, (list, tuple)):
+        return type(value)(_handle(item) for item in value)
+    if isinstance(value, PRIMITIVES):
+        return value
+    raise _Unmemoizable()
+
+
+def _memoized(qualified_name: str, function: Callable[..., Any]) -> Callable[..., Any]:
+    def wrapper(*args, **kwargs):
+        memo = _memo
+        if memo is None:
+            return function(*args, **kwargs)
+        inputs: List[Any] = []
+        try:
+            key = (qualified_name, _key(args, inputs), _key(kwargs, inputs))
+        except _Unmemoizable:
+            memo.count("bypassed")
+            return function(*args, **kwargs)
+
+        entry = memo.get(key)
+        if entry is not None and _same(entry.inputs, inputs):
+            memo.count("hits")
+            if entry.in_place:
+                args[0].wrapped = _handle(entry.result).wrapped
+                return args[0]
+            return _handle(entry.result)
+
+        memo.count("misses")
+        # Remember the inputs as they are now; an in-place method replaces self.wrapped below
+        stored_inputs = [_handle(value) if isinstance(value, _topology().Shape) else value for value in inputs]
+        result = function(*args, **kwargs)
+        in_place = bool(args) and result is args[0]
+        try:
+            memo.put(key, _Entry(stored_inputs, _handle(result), in_place))
+        except _Unmemoizable:
+            pass  # Results that are not shapes or primitives are not cached
+        return result
+
+    wrapper.__wrapped__ = function
+    wrapper.__name__ = getattr(function, "__name__", qualified_name)
+    wrapper.__doc__ = getattr(function, "__doc__", None)
+    return wrapper
+
+
+def _patch(cls: type, name: str) -> None:
+    descriptor = None
+    for klass in cls.__mro__:
+        if name in vars(klass):
+            descriptor = vars(klass)[name]
+            break
+    if descriptor is None:
+        return  # Not in this build123d version
+    function = descriptor.__func__ if isinstance(descriptor, (classmethod, staticmethod)) else descriptor
+    if getattr(function, "__wrapped__", None) is not None:
+        return  # Already memoized
+    wrapper = _memoized(f"{cls.__name__}.{name}", function)
+    if isinstance(descriptor, classmethod):
+        wrapper = classmethod(wrapper)
+    elif isinstance(descriptor, staticmethod):
+        wrapper = staticmethod(wrapper)
+    setattr(cls, name, wrapper)
+
+
+def install(maxsize: int) -> Memo:
+    """
+    Memoizes MEMOIZED_METHODS in this process with an LRU of maxsize entries and returns the memo.
+    Installing again keeps the cached entries and only changes the bound.
+    """
+    global _memo
+    with _install_lock:
+        if _memo is None:
+            topology = _topology()
+            if not hasattr(topology, "downcast"):
+                raise RuntimeError("Memoization needs build123d.topology.downcast, which this build123d does not have")
+            for class_name, names in MEMOIZED_METHODS.items():
+                cls = getattr(topology, class_name, None)
+                if cls is not None:
+                    for name in names:
+                        _patch(cls, name)
+            _memo = Memo(maxsize)
+        with _memo.lock:
+            _memo.maxsize = maxsize
+        return _memo
@@ -0,0 +1,248 @@
+"""
+Triangle meshes of executed parts as NumPy arrays.
+
+A part is tessellated with the kernel's mesher, and the nodes and triangles of
+every face are copied into one float64 vertex array and one int64 triangle
+array, with each face's location applied and reversed faces flipped, so that
+every triangle is oriented outwards. Volume, area and center of mass are then
+computed from the whole mesh at once with the divergence theorem, independently
+of the kernel's surface integration, and binary STL is written from the arrays
+in a single write instead of one triangle at a time.
+
+Copying the mesh out of the kernel costs a few microseconds per node and
+triangle, more than the kernel's own STL writer needs for the whole export, so
+write_stl pays off for meshes that are already arrays, not for exporting parts
+(see artifacts.export_stl). Run it to compare both on some examples:
+
+    python mesh.py examples/example-29.py examples/example-34.py --tolerance 0.001
+
+NumPy is an optional dependency: pip install geminiscript[mesh].
+"""
+import argparse
+import struct
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Union
+
+import numpy as np
+
+DEFAULT_TOLERANCE = 0.1  # Maximum distance in mm between the mesh and the surface
+DEFAULT_ANGULAR_TOLERANCE = 0.5  # Maximum angle in radians between neighbouring triangles on a curved face
+STL_HEADER = b"Binary STL written by mesh.py"  # At most 80 bytes; must not start with "solid", which marks ASCII STL
+# One binary STL triangle: normal, three corners, attribute byte count; 50 bytes without padding
+STL_RECORD = np.dtype([("normal", "<f4", (3,)), ("corners", "<f4", (3, 3)), ("attribute", "<u2")])
+
+
+class Mesh(NamedTuple):
+    vertices: np.ndarray  # (n, 3) float64 coordinates in mm
+    triangles: np.ndarray  # (m, 3) int64 vertex indices, counter-clockwise seen from outside
+    deflections: np.ndarray  # (m,) float64 largest distance in mm between each triangle and its face
+    exact: np.ndarray  # (m,) bool, the triangle's face is planar with straight edges, so its mesh covers it exactly
+
+
+def tessellate(
+    part: Any,
+    tolerance: float = DEFAULT_TOLERANCE,
+    angular_tolerance: float = DEFAULT_ANGULAR_TOLERANCE,
+    measure_deflections: bool = False,
+) -> Mesh:
+    """
+    Meshes a part (or reuses a finer mesh it already has) and returns the mesh of all its faces.
+
+    The deflection of a curved face's triangles is the one the kernel's mesher reports for the
+    whole face, unless measure_deflections is set; see _measured_deflections().
+    """
+    from OCP.BRep import BRep_Tool
+    from OCP.BRepAdaptor import BRepAdaptor_Curve, BRepAdaptor_Surface
+    from OCP.BRepMesh import BRepMesh_IncrementalMesh
+    from OCP.GeomAbs import GeomAbs_Line, GeomAbs_Plane
+    from OCP.TopAbs import TopAbs_EDGE, TopAbs_FACE, TopAbs_REVERSED
+    from OCP.TopExp import TopExp_Explorer
+    from OCP.TopLoc import TopLoc_Location
+    from OCP.TopoDS import TopoDS
+
+    BRepMesh_IncrementalMesh(part.wrapped, tolerance, False, angular_tolerance, True)
+    vertices, triangles, deflections, exact, offset = [], [], [], [], 0
+    explorer = TopExp_Explorer(part.wrapped, TopAbs_FACE)
+    while explorer.More():
+        face = TopoDS.Face(explorer.Current())
+        explorer.Next()
+        location = TopLoc_Location()
+        triangulation = BRep_Tool.Triangulation_s(face, location)
+        if triangulation is None:
+            continue  # The mesher failed on this face
+        count = triangulation.NbNodes()
+        nodes = np.array(
+            [triangulation.Node(index).Coord() for index in range(1, count + 1)], dtype=np.float64
+        ).reshape(count, 3)
+        if not location.IsIdentity():
+            transformation = location.Transformation()
+            matrix = np.array([[transformation.Value(row, column) for column in range(1, 5)] for row in range(1, 4)])
+            nodes = nodes @ matrix[:, :3].T + matrix[:, 3]
+        corners = np.array(
+            [triangulation.Triangle(index).Get() for index in range(1, triangulation.NbTriangles() + 1)],
+            dtype=np.int64,
+        ).reshape(-1, 3) - 1
+        if face.Orientation() == TopAbs_REVERSED:
+            corners = corners[:, [0, 2, 1]]
+        vertices.append(nodes)
+        triangles.append(corners + offset)
+        planar = BRepAdaptor_Surface(face).GetType() == GeomAbs_Plane
+        if planar:
+            deflections.append(np.zeros(len(corners)))
+        elif measure_deflections and triangulation.HasUVNodes():
+            deflections.append(_measured_deflections(face, triangulation, nodes, corners))
+        else:
+            deflections.append(np.full(len(corners), triangulation.Deflection()))
+        if planar:
+            edges = TopExp_Explorer(face, TopAbs_EDGE)
+            while planar and edges.More():
+                planar = BRepAdaptor_Curve(TopoDS.Edge(edges.Current())).GetType() == GeomAbs_Line
+                edges.Next()
+        exact.append(np.full(len(corners), planar))
+        offset += count
+    if not vertices:
+        return Mesh(np.empty((0, 3)), np.empty((0, 3), dtype=np.int64), np.empty(0), np.empty(0, dtype=bool))
+    return Mesh(*(np.concatenate(arrays) for arrays in (vertices, triangles, deflections, exact)))
+
+
+def _measured_deflections(face: Any, triangulation: Any, nodes: np.ndarray, corners: np.ndarray) -> np.ndarray:
+    """
+    Returns the deflection of every triangle of a curved face, measured on its edges.
+
+    The kernel's per-face value is only an estimate, and a poor one on some faces: on the
+    extruded Bezier face of example-30 it stays at 0.4 mm whatever the tolerance, while it
+    understates the walls of the extruded text of example-34. So the surface is evaluated at the
+    parametric midpoint of every mesh edge and compared with the edge's midpoint. Where the surface
+    is close to quadratic over a triangle, the triangle is nowhere further from it than 4/3 of the
+    largest of its three edge gaps, which is returned.
+    """
+    from OCP.BRepAdaptor import BRepAdaptor_Surface
+
+    surface = BRepAdaptor_Surface(face)  # Placed by the face's location, like the nodes
+    count = triangulation.NbNodes()
+    uv = np.array([triangulation.UVNode(index).Coord() for index in range(1, count + 1)]).reshape(count, 2)
+    edges = np.sort(corners[:, [[0, 1], [1, 2], [2, 0]]], axis=2).reshape(-1, 2)
+    unique, inverse = np.unique(edges, axis=0, return_inverse=True)  # Edges are shared by two triangles
+    on_surface = np.array([surface.Value(u, v).Coord() for u, v in uv[unique].mean(axis=1)]).reshape(-1, 3)
+    offsets = (on_surface - nodes[unique].mean(axis=1))[inverse.reshape(-1)].reshape(-1, 3, 3)
+    # Only the offset across each triangle counts; the parametric midpoint can also slide along the surface
+    corner_points = nodes[corners]
+    normals = np.cross(corner_points[:, 1] - corner_points[:, 0], corner_points[:, 2] - corner_points[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+    gaps = np.abs(np.einsum("tej,tj->te", offsets, normals))
+    return 4 / 3 * gaps.max(axis=1)
+
+
+def mesh_properties(mesh: Mesh) -> Dict[str, Any]:
+    """
+    Returns the volume, area and center of mass enclosed by a closed, outward-oriented mesh, the
+    area of the faces it does not cover exactly, and volume_bound, the most its volume can differ
+    from the part's.
+
+    The volume is the sum of the signed volumes of the tetrahedra between every
+    triangle and a reference point, and the center of mass their volume-weighted mean.
+    A triangle no further than its deflection from its face's surface misses at most
+    deflection * area of volume, so volume_bound is the sum of those.
+    """
+    origin = mesh.vertices.mean(axis=0) if len(mesh.vertices) else np.zeros(3)
+    first, second, third = (mesh.vertices[mesh.triangles[:, corner]] - origin for corner in range(3))
+    normals = np.cross(second - first, third - first)
+    areas = np.linalg.norm(normals, axis=1) / 2
+    volumes = np.einsum("ij,ij->i", first, np.cross(second, third)) / 6
+    volume = volumes.sum()
+    if volume:
+        center = (first + second + third).T @ volumes / (4 * volume) + origin
+    else:
+        center = origin
+    return {
+        "volume": float(volume),
+        "area": float(areas.sum()),
+        "center_of_mass": center.tolist(),
+        "inexact_area": float(areas[~mesh.exact].sum()),
+        "volume_bound": float(mesh.deflections @ areas),
+    }
+
+
+def write_stl(mesh: Mesh, path: Union[str, Path]) -> int:
+    """
+    Writes the mesh as binary STL with a single write and returns the number of triangles.
+    """
+    corners = mesh.vertices[mesh.triangles]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    # Header, triangle count and records are filled in place in one buffer, so nothing is copied to write it
+    buffer = np.zeros(84 + STL_RECORD.itemsize * len(corners), dtype=np.uint8)
+    buffer[:len(STL_HEADER)] = np.frombuffer(STL_HEADER, dtype=np.uint8)
+    buffer[80:84] = np.frombuffer(struct.pack("<I", len(corners)), dtype=np.uint8)
+    records = buffer[84:].view(STL_RECORD)
+    records["normal"] = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+    records["corners"] = corners
+    with open(path, "wb") as file:
+        file.write(buffer.data)
+    return len(corners)
+
+
+def benchmark_stl(part: Any, tolerance: float, angular_tolerance: float, repeat: int) -> Dict[str, float]:
+    """
+    Times write_stl and build123d's export_stl on part, with the same mesh settings, best of repeat.
+    The part is meshed once beforehand, so both writers reuse the same triangulation.
+
+    Returns:
+        dict: Seconds of tessellate (copying the mesh into arrays), write_stl and export_stl,
+        and the number of triangles.
+    """
+    import build123d
+
+    tessellate(part, tolerance, angular_tolerance)
+    timings: Dict[str, float] = {"tessellate": float("inf"), "write_stl": float("inf"), "export_stl": float("inf")}
+    with tempfile.TemporaryDirectory() as directory:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            mesh = tessellate(part, tolerance, angular_tolerance)
+            timings["tessellate"] = min(timings["tessellate"], time.perf_counter() - started)
+            started = time.perf_counter()
+            timings["triangles"] = write_stl(mesh, Path(directory) / "mesh.stl")
+            timings["write_stl"] = min(timings["write_stl"], time.perf_counter() - started)
+            started = time.perf_counter()
+            # export_stl's deflection is relative to the size of each edge, so it normally keeps the existing mesh
+            build123d.export_stl(part, str(Path(directory) / "kernel.stl"), tolerance, angular_tolerance)
+            timings["export_stl"] = min(timings["export_stl"], time.perf_counter() - started)
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the NumPy STL writer with build123d's export_stl.")
+    parser.add_argument("examples", type=Path, nargs="+", help="Example files, e.g. examples/example-29.py")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="Mesh deflection in mm (default: %(default)s)")
+    parser.add_argument(
+        "--angular-tolerance", type=float, default=0.1, help="Mesh angular deflection in radians (default: %(default)s)"
+    )
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="Runs per writer, best is reported (default: 5)")
+    args = parser.parse_args()
+
+    from artifacts import ArtifactStore
+    from execution import RunOptions, run_source
+
+    print(
+        f"{'example':<16} {'triangles':>10} {'tessellate':>11} {'write_stl':>10} {'export_stl':>11}  "
+        "speedup of write_stl from arrays / from the part"
+    )
+    with tempfile.TemporaryDirectory() as artifact_dir:
+        options = RunOptions(post_processors=("artifact",), artifact_dir=artifact_dir)
+        for example in args.examples:
+            source = example.read_text()
+            result = run_source(source, example.name, options=options)
+            if result.status != "ok":
+                print(f"{example.name:<16} {result.status}")
+                continue
+            part = ArtifactStore(Path(artifact_dir)).load(Path(result.outputs["artifact"]).stem)
+            timings = benchmark_stl(part, args.tolerance, args.angular_tolerance, args.repeat)
+            from_part = timings["tessellate"] + timings["write_stl"]
+            print(
+                f"{example.name:<16} {timings['triangles']:>10} {timings['tessellate'] * 1000:>9.1f}ms "
+                f"{timings['write_stl'] * 1000:>8.1f}ms {timings['export_stl'] * 1000:>9.1f}ms  "
+                f"{timings['export_stl'] / timings['write_stl']:.2f}x / {timings['export_stl'] / from_part:.2f}x"
+            )
@@ -0,0 +1,191 @@
+"""
+Properties measured on the part an example produces.
+
+All requested properties are taken from the live part in a single pass, and
+properties that come from the same kernel computation (at the default precision, volume
+and center of mass come from one GProp volume integration) share that computation.
+Like build123d's volume property, the integration covers only the solids and
+closed shells of the part; loose faces, wires and edges enclose no volume.
+
+The volume integration has three precisions. "default" is the kernel's
+fixed-order Gauss rule, the same as build123d's volume property: it has no
+error estimate. "fast" and "exact" use the kernel's adaptive Gauss-Kronrod
+integration, whose error estimate is the difference between the Gauss rule and
+the Kronrod rule it is embedded in; "fast" integrates coarsely and re-integrates
+only the volumes whose estimate exceeds the volume tolerance, which is cheaper
+than the fixed rule, and "exact" integrates to a tight tolerance. A volume is labelled with the precision its estimate backs up. The
+center of mass always comes from the fixed-order rule, since the adaptive one
+is unusably slow at integrating it.
+"""
+from functools import cached_property
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+VOLUME_PRECISIONS = ("default", "fast", "exact")  # In increasing order of accuracy
+FAST_TOLERANCE = 1e-3  # Relative tolerance of the first, coarse Gauss-Kronrod integration of a fast volume
+EXACT_TOLERANCE = 1e-9  # Relative tolerance of the Gauss-Kronrod integration of an exact volume
+EXACT_ERROR = 1e-8  # Largest estimated relative error of a volume labelled exact
+DEFAULT_VOLUME_TOLERANCE = 1e-4  # Relative tolerance of a fast volume, and the largest estimate labelled fast
+
+
+class PartMeasurements:
+    """Lazily computed kernel queries on a part, shared between property extractors."""
+
+    def __init__(
+        self, part: Any, precision: str = "default", volume_tolerance: float = DEFAULT_VOLUME_TOLERANCE
+    ) -> None:
+        self.part = part
+        self.precision = precision
+        self.volume_tolerance = volume_tolerance
+
+    @cached_property
+    def volume_shapes(self) -> List[Any]:
+        """
+        The solids and closed shells of the part that build123d's volume property adds up, as OCP shapes.
+        """
+        # Imported here so that processes which only coordinate examples do not need build123d
+        from build123d import Compound, Shell, Solid
+        from OCP.ShapeFix import ShapeFix_Solid
+
+        if isinstance(self.part, Compound):
+            solids, shells = self.part.get_type(Solid), self.part.get_type(Shell)
+        else:
+            solids = [self.part] if isinstance(self.part, Solid) else []
+            shells = [self.part] if isinstance(self.part, Shell) else []
+        # build123d counts a shell only if it is closed, as the solid it bounds
+        closed = [ShapeFix_Solid().SolidFromShell(shell.wrapped) for shell in shells if shell.is_manifold]
+        return [solid.wrapped for solid in solids] + closed
+
+    @cached_property
+    def fixed_rule(self) -> Any:
+        """
+        The GProp volume properties of the volume shapes from the kernel's fixed-order Gauss rule.
+        """
+        # Imported here so that processes which only coordinate examples do not need OCP
+        from OCP.BRepGProp import BRepGProp
+        from OCP.GProp import GProp_GProps
+
+        properties = GProp_GProps()
+        # Integrated one by one and added in build123d's order, so the default volume equals part.volume exactly
+        for shape in self.volume_shapes:
+            shape_properties = GProp_GProps()
+            BRepGProp.VolumeProperties_s(shape, shape_properties)
+            properties.Add(shape_properties)
+        return properties
+
+    def _gauss_kronrod(self, tolerance: float) -> Tuple[float, float]:
+        """
+        Returns the volume of the volume shapes from the kernel's adaptive Gauss-Kronrod integration to a
+        relative tolerance, and its estimated relative error: the difference between the Gauss rule and
+        the Kronrod rule it is embedded in.
+        """
+        from OCP.BRepGProp import BRepGProp
+        from OCP.GProp import GProp_GProps
+
+        volume = absolute_error = 0.0
+        for shape in self.volume_shapes:
+            shape_properties = GProp_GProps()
+            # Volume only: the center of mass is not integrated without CGFlag, which makes it far slower
+            error = BRepGProp.VolumePropertiesGK_s(shape, shape_properties, tolerance)
+            volume += shape_properties.Mass()
+            absolute_error += error * abs(shape_properties.Mass())
+        return volume, absolute_error / abs(volume) if volume else absolute_error
+
+    @cached_property
+    def volume_integration(self) -> Tuple[float, Optional[float], str]:
+        """
+        The volume at the requested precision, its estimated relative error (None for "default") and
+        the most precise label its estimate backs up: "exact" within EXACT_ERROR, "fast" within the
+        volume tolerance and "default" otherwise.
+
+        A fast volume is integrated coarsely first, and only a volume whose estimate exceeds the
+        volume tolerance is integrated again, to a hundredth of it and then to the exact tolerance.
+        """
+        if self.precision == "default":
+            return self.fixed_rule.Mass(), None, "default"
+        if self.precision == "fast":
+            tolerances, target = (FAST_TOLERANCE, self.volume_tolerance / 100, EXACT_TOLERANCE), self.volume_tolerance
+        else:
+            tolerances, target = (EXACT_TOLERANCE,), EXACT_ERROR
+        for tolerance in tolerances:
+            volume, error = self._gauss_kronrod(tolerance)
+            if error <= target:
+                break
+        if error <= EXACT_ERROR:
+            return volume, error, "exact"
+        return volume, error, "fast" if error <= self.volume_tolerance else "default"
+
+    @cached_property
+    def bounding_box(self) -> Any:
+        return self.part.bounding_box()
+
+
+def _vector(vector: Any) -> List[float]:
+    return [vector.X, vector.Y, vector.Z]
+
+
+def is_valid(part: Any) -> bool:
+    """
+    Returns the kernel's validity check of a part. is_valid is a method in older
+    build123d releases and a property in newer ones.
+    """
+    valid = part.is_valid
+    return bool(valid() if callable(valid) else valid)
+
+
+def _center_of_mass(measurements: PartMeasurements) -> List[float]:
+    center = measurements.fixed_rule.CentreOfMass()
+    return [center.X(), center.Y(), center.Z()]
+
+
+PROPERTY_EXTRACTORS: Dict[str, Callable[[PartMeasurements], Any]] = {
+    "volume": lambda measurements: measurements.volume_integration[0],
+    "volume_error": lambda measurements: measurements.volume_integration[1],
+    "volume_precision": lambda measurements: measurements.volume_integration[2],
+    "area": lambda measurements: measurements.part.area,
+    "center_of_mass": _center_of_mass,
+    "bounding_box": lambda measurements: {
+        "min": _vector(measurements.bounding_box.min),
+        "max": _vector(measurements.bounding_box.max),
+        "size": _vector(measurements.bounding_box.size),
+    },
+    "solids": lambda measurements: len(measurements.part.solids()),
+    "shells": lambda measurements: len(measurements.part.shells()),
+    "faces": lambda measurements: len(measurements.part.faces()),
+    "wires": lambda measurements: len(measurements.part.wires()),
+    "edges": lambda measurements: len(measurements.part.edges()),
+    "vertices": lambda measurements: len(measurements.part.vertices()),
+    "is_valid": lambda measurements: is_valid(measurements.part),
+}
+PROPERTY_NAMES = tuple(PROPERTY_EXTRACTORS)
+
+# Unit appended to the "# Name: value unit" comment of an annotated example
+PROPERTY_UNITS = {"volume": "mm^3", "area": "mm^2", "center_of_mass": "mm", "bounding_box": "mm"}
+
+
+def extract_properties(
+    part: Any, names: Iterable[str], precision: str = "default", volume_tolerance: float = DEFAULT_VOLUME_TOLERANCE
+) -> Dict[str, Any]:
+    """
+    Measures the named properties of a part in one pass.
+
+    Args:
+        part: The build123d shape assigned to ``part`` by the example.
+        names (Iterable[str]): Keys of PROPERTY_EXTRACTORS.
+        precision (str): Precision of the volume integration, one of VOLUME_PRECISIONS.
+        volume_tolerance (float): Relative tolerance of a "fast" volume, and the largest estimated
+            relative error labelled "fast" or "exact".
+
+    Returns:
+        dict: JSON-serialisable value of every requested property.
+    """
+    measurements = PartMeasurements(part, precision, volume_tolerance)
+    return {name: PROPERTY_EXTRACTORS[name](measurements) for name in names}
+
+
+def property_comment(name: str, value: Any) -> str:
+    """
+    Returns the comment line recording a property in an annotated example, e.g. "# Area: 1234.5 mm^2".
+    """
+    label = name.replace("_", " ").capitalize()
+    unit = PROPERTY_UNITS.get(name)
+    return f"# {label}: {value} {unit}" if unit else f"# {label}: {value}"
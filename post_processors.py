@@ -0,0 +1,214 @@
+"""
+Post-processors applied to the live part of every executed example.
+
+An example is executed once, and the part it assigns to ``part`` is handed to
+each requested post-processor in turn, in the process that executed it. Every
+post-processor returns JSON-serialisable data, which is stored under its name in
+ExampleResult.outputs. A new analysis is added by registering a function here,
+or in a plugin module named in RunOptions.plugins:
+
+    @post_processor("face_count")
+    def face_count(part, context):
+        return len(part.faces())
+"""
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from part_properties import extract_properties, is_valid, property_comment
+
+NUMERICAL_NOISE = 1e-9  # Relative difference always allowed between mesh and kernel properties
+MESH_CHECK_TOLERANCE = 0.1  # Mesh deflection in mm of the mesh check of default-precision volumes
+PRECISE_MESH_CHECK_TOLERANCE = 0.01  # Mesh deflection in mm of the mesh check of fast and exact volumes
+
+
+class PostContext(NamedTuple):
+    """What a post-processor knows about the example besides its part."""
+    name: str  # Example file name
+    source: str  # Example source
+    options: Any  # The RunOptions of the run
+    outputs: Dict[str, Any]  # Outputs of the post-processors that ran before this one
+
+
+PostProcessor = Callable[[Any, PostContext], Any]
+POST_PROCESSORS: Dict[str, PostProcessor] = {}
+
+
+def post_processor(name: str) -> Callable[[PostProcessor], PostProcessor]:
+    """
+    Registers a post-processor under name.
+    """
+    def register(function: PostProcessor) -> PostProcessor:
+        POST_PROCESSORS[name] = function
+        return function
+    return register
+
+
+def run_post_processors(part: Any, context: PostContext) -> Dict[str, Any]:
+    """
+    Runs the post-processors named in context.options.post_processors on part, in order.
+
+    The "properties" post-processor always runs first, because the volume comes from it.
+
+    Returns:
+        dict: Output of every post-processor by name.
+    """
+    names = dict.fromkeys(("properties", *context.options.post_processors))
+    for name in names:
+        context.outputs[name] = POST_PROCESSORS[name](part, context)
+    return context.outputs
+
+
+@post_processor("properties")
+def measure_properties(part: Any, context: PostContext) -> Dict[str, Any]:
+    """
+    Measures the volume and the other requested part properties in one pass.
+    Above the default volume precision, the error estimate and the precision used are measured too.
+    """
+    options = context.options
+    names = ("volume", *options.properties)
+    if options.volume_precision != "default":
+        names += ("volume_error", "volume_precision")
+    return extract_properties(part, tuple(dict.fromkeys(names)), options.volume_precision, options.volume_tolerance)
+
+
+@post_processor("validity")
+def check_validity(part: Any, context: PostContext) -> Dict[str, Any]:
+    """
+    Runs the kernel's shape checker and counts the solids, so broken or empty results are flagged.
+    """
+    return {"is_valid": is_valid(part), "solids": len(part.solids())}
+
+
+@post_processor("export")
+def export_part(part: Any, context: PostContext) -> Dict[str, str]:
+    """
+    Exports the part to each of RunOptions.export_formats in the content-addressed artifact store,
+    unless an identical source was exported before, and links it as <export_dir>/<example>.<format>
+    if RunOptions.export_dir is set. STL is meshed to the example's stl_tolerance().
+
+    Returns:
+        dict: Path of the export in the artifact store by format.
+    """
+    from artifacts import DEFAULT_ARTIFACT_DIR, ArtifactStore, source_hash
+
+    options = context.options
+    store = ArtifactStore(Path(options.artifact_dir or DEFAULT_ARTIFACT_DIR))
+    exported = store.export(
+        source_hash(context.source), part, options.export_formats, stl_tolerance(options, context.name)
+    )
+    if options.export_dir is not None:
+        link_exports(exported, Path(options.export_dir), Path(context.name).stem)
+    return exported
+
+
+def stl_tolerance(options: Any, name: str) -> Optional[float]:
+    """
+    Returns the STL mesh deflection in mm for the example with this file name, None for the default.
+    """
+    return dict(options.stl_tolerances).get(Path(name).stem, options.stl_tolerance)
+
+
+def mesh_tolerance(options: Any) -> float:
+    """
+    Returns the mesh deflection in mm of the "mesh_check" post-processor. Unless set, it is finer
+    when the volume is "fast" or "exact", since the check should then catch errors of 1e-4 and below.
+    """
+    if options.mesh_tolerance is not None:
+        return options.mesh_tolerance
+    return MESH_CHECK_TOLERANCE if options.volume_precision == "default" else PRECISE_MESH_CHECK_TOLERANCE
+
+
+def link_exports(exported: Dict[str, str], export_dir: Path, stem: str) -> None:
+    """
+    Makes each exported file available as <export_dir>/<stem>.<format>, as a hard link where possible.
+    """
+    export_dir.mkdir(parents=True, exist_ok=True)
+    for export_format, path in exported.items():
+        target = export_dir / f"{stem}.{export_format}"
+        target.unlink(missing_ok=True)
+        try:
+            os.link(path, target)
+        except OSError:
+            shutil.copyfile(path, target)  # Another file system, or no hard links
+
+
+@post_processor("artifact")
+def store_artifact(part: Any, context: PostContext) -> str:
+    """
+    Stores the part as binary BREP in the content-addressed artifact store, keyed by the source hash.
+
+    Returns:
+        str: Path of the artifact.
+    """
+    from artifacts import DEFAULT_ARTIFACT_DIR, ArtifactStore, source_hash
+
+    store = ArtifactStore(Path(context.options.artifact_dir or DEFAULT_ARTIFACT_DIR))
+    return str(store.save(source_hash(context.source), part))
+
+
+@post_processor("mesh_check")
+def check_mesh(part: Any, context: PostContext) -> Dict[str, Any]:
+    """
+    Recomputes volume, area and center of mass from a triangle mesh of the part and flags the kernel
+    properties that disagree by more than the mesh can explain. Needs NumPy, see mesh.py.
+
+    A triangle within its deflection of a curved face differs from it by at most deflection * area
+    in volume (planar faces by nothing), so the mesh volume can be off by its volume_bound; the
+    center of mass can move by at most volume_bound / volume times the bounding box diagonal. The
+    deflection of every curved triangle is measured rather than taken from the kernel's mesher, see
+    mesh._measured_deflections. A polygon with corners at most angular_tolerance apart along a curve
+    loses up to angular_tolerance ** 2 / 6 of the area under it, which is allowed on every face that
+    is not planar with straight edges. A relative NUMERICAL_NOISE is always allowed.
+
+    The check therefore only catches volume errors larger than volume_sensitivity, volume_bound
+    relative to the volume. On the corpus, the bound is 2 to 3 times the mesh's actual error. At the
+    0.1 mm of MESH_CHECK_TOLERANCE its median is 2.4e-3 and it reaches 0.1 on thin walls (example-29).
+    At the 0.01 mm used for fast and exact volumes the median is 2.5e-4 and the maximum 1.1e-2.
+
+    Returns:
+        dict: The mesh's triangle count, mesh_properties() and volume_sensitivity, and the names of
+        the disagreeing properties under "disagreements".
+    """
+    from mesh import DEFAULT_ANGULAR_TOLERANCE, mesh_properties, tessellate
+
+    options = context.options
+    kernel = dict(context.outputs.get("properties", {}))
+    missing = [name for name in ("volume", "area", "center_of_mass") if name not in kernel]
+    kernel.update(extract_properties(part, missing, options.volume_precision, options.volume_tolerance))
+
+    tessellated = tessellate(part, mesh_tolerance(options), measure_deflections=True)
+    measured = mesh_properties(tessellated)
+    diagonal = part.bounding_box().diagonal
+    volume_bound = measured["volume_bound"] + NUMERICAL_NOISE * abs(kernel["volume"])
+    area_bound = measured["inexact_area"] * DEFAULT_ANGULAR_TOLERANCE ** 2 / 6 + NUMERICAL_NOISE * kernel["area"]
+    center_bound = (volume_bound / abs(kernel["volume"]) if kernel["volume"] else NUMERICAL_NOISE) * diagonal
+    center_distance = sum(
+        (mesh_value - kernel_value) ** 2
+        for mesh_value, kernel_value in zip(measured["center_of_mass"], kernel["center_of_mass"])
+    ) ** 0.5
+    checks = {
+        "volume": abs(measured["volume"] - kernel["volume"]) <= volume_bound,
+        "area": abs(measured["area"] - kernel["area"]) <= area_bound,
+        "center_of_mass": center_distance <= center_bound,
+    }
+    return {
+        "triangles": len(tessellated.triangles),
+        **measured,
+        "volume_sensitivity": measured["volume_bound"] / abs(kernel["volume"]) if kernel["volume"] else None,
+        "disagreements": [name for name, agrees in checks.items() if not agrees],
+    }
+
+
+def annotated_source(source: str, volume_text: str, properties: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Returns the example source followed by its "# Volume: ... mm^3" comment and one
+    comment line per other property.
+
+    Annotation happens in the controlling process rather than as a post-processor,
+    because failed examples have no part but still get a volume comment.
+    """
+    comments = [f"# Volume: {volume_text} mm^3"]
+    comments += [property_comment(name, value) for name, value in (properties or {}).items() if name != "volume"]
+    return f"{source}\n" + "\n".join(comments) + "\n"
@@ -0,0 +1,147 @@
+"""
+Hotspot report of build123d entry points across a profiled corpus.
+
+With main2.py --profile every example is executed under cProfile and its stats are
+kept as <profile dir>/<example>.pstats. This module merges those files and ranks
+the build123d callables that the examples call directly (BuildPart, extrude,
+fillet, Text, ...) by the cumulative time spent in them.
+"""
+import argparse
+import ast
+import functools
+import os
+import pstats
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+REPORT_FILE_NAME = "report.txt"
+MERGED_STATS_FILE_NAME = "corpus.pstats"
+_PACKAGE_MARKER = f"{os.sep}build123d{os.sep}"
+
+
+def profile_path(profile_dir: str, name: str) -> Path:
+    """
+    Returns the .pstats file of an example inside the profile directory.
+    """
+    return Path(profile_dir) / f"{Path(name).stem}.pstats"
+
+
+class EntryPoint(NamedTuple):
+    """Time spent in one build123d callable, summed over the corpus."""
+    name: str
+    calls: int
+    cumulative_time: float
+    examples: int
+
+
+@functools.lru_cache(maxsize=None)
+def _methods_by_line(filename: str) -> Dict[int, str]:
+    """
+    Maps the first line of every method defined in a file (decorator or def line) to its class name.
+    """
+    try:
+        tree = ast.parse(Path(filename).read_text())
+    except (OSError, SyntaxError, ValueError):
+        return {}
+    methods = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ClassDef):
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    methods[item.lineno] = node.name
+                    for decorator in item.decorator_list:
+                        methods[decorator.lineno] = node.name
+    return methods
+
+
+def entry_point_name(filename: str, line: int, function: str) -> str:
+    """
+    Returns the name a build123d callable is reported under.
+
+    Special methods are reported under their class, so Box(...) and
+    "with BuildPart():" show up as Box and BuildPart rather than __init__ and __exit__.
+    """
+    if function.startswith("__") and function.endswith("__"):
+        class_name = _methods_by_line(filename).get(line)
+        if class_name is not None:
+            return class_name
+    return function
+
+
+def aggregate(stats_files: List[Path]) -> List[EntryPoint]:
+    """
+    Sums calls and cumulative time of the build123d callables called directly by the examples.
+
+    Args:
+        stats_files (list[Path]): One .pstats file per example.
+
+    Returns:
+        list[EntryPoint]: Entry points ordered by descending cumulative time.
+    """
+    calls: Dict[str, int] = {}
+    times: Dict[str, float] = {}
+    examples: Dict[str, int] = {}
+
+    for stats_file in stats_files:
+        stats = pstats.Stats(str(stats_file))
+        example = stats_file.stem  # Examples are compiled under their file name, see profile_path()
+        used = set()
+        for (filename, line, function), (_, _, _, _, callers) in stats.stats.items():
+            if _PACKAGE_MARKER not in filename:
+                continue
+            # Only count calls made from example code, not build123d calling itself
+            for (caller_filename, _, _), (call_count, _, _, cumulative_time) in callers.items():
+                if Path(caller_filename).stem == example:
+                    name = entry_point_name(filename, line, function)
+                    calls[name] = calls.get(name, 0) + call_count
+                    times[name] = times.get(name, 0.0) + cumulative_time
+                    used.add(name)
+        for name in used:
+            examples[name] = examples.get(name, 0) + 1
+
+    entry_points = [EntryPoint(name, calls[name], times[name], examples[name]) for name in times]
+    return sorted(entry_points, key=lambda entry_point: entry_point.cumulative_time, reverse=True)
+
+
+def format_report(entry_points: List[EntryPoint], total_examples: int, limit: Optional[int] = None) -> str:
+    """
+    Formats entry points as a ranked table.
+    """
+    total_time = sum(entry_point.cumulative_time for entry_point in entry_points) or 1.0
+    lines = [
+        f"build123d entry points over {total_examples} profiled examples",
+        "",
+        f"{'rank':>4}  {'entry point':<28} {'calls':>8} {'cumtime (s)':>12} {'share':>7} {'examples':>9}",
+    ]
+    for rank, entry_point in enumerate(entry_points[:limit], start=1):
+        lines.append(
+            f"{rank:>4}  {entry_point.name:<28} {entry_point.calls:>8} {entry_point.cumulative_time:>12.4f} "
+            f"{entry_point.cumulative_time / total_time:>7.1%} {entry_point.examples:>9}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def write_report(profile_dir: Path, limit: Optional[int] = None) -> str:
+    """
+    Aggregates every .pstats file in profile_dir, writes report.txt and corpus.pstats there,
+    and returns the report.
+    """
+    stats_files = sorted(
+        path for path in Path(profile_dir).glob("*.pstats") if path.name != MERGED_STATS_FILE_NAME
+    )
+    if not stats_files:
+        return "No profiles found\n"
+
+    report = format_report(aggregate(stats_files), len(stats_files), limit)
+    (Path(profile_dir) / REPORT_FILE_NAME).write_text(report)
+    pstats.Stats(*(str(path) for path in stats_files)).dump_stats(str(Path(profile_dir) / MERGED_STATS_FILE_NAME))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank build123d entry points across per-example profiles.")
+    parser.add_argument("profile_dir", type=Path, help="Directory of .pstats files written by main2.py --profile")
+    parser.add_argument("-n", "--limit", type=int, help="Only show the top N entry points")
+    args = parser.parse_args()
+
+    print(write_report(args.profile_dir, args.limit), end="")
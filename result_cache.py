@@ -0,0 +1,117 @@
+"""
+Content-addressed cache of example results.
+
+Entries are keyed on the SHA-256 of the example source together with the installed
+build123d and OCP versions, so editing an example or upgrading the kernel
+invalidates exactly the entries it affects.
+"""
+import hashlib
+import json
+import os
+from functools import lru_cache
+from importlib import metadata
+from pathlib import Path
+from typing import Dict, Optional
+
+from execution import ExampleResult
+
+DEFAULT_CACHE_DIR = Path(".cache") / "results"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Modules that determine an example's result. OCP is published as several distributions
+# (cadquery-ocp, cadquery-ocp-novtk, ...), so the distributions are looked up from the modules.
+VERSIONED_MODULES = ("build123d", "OCP")
+
+
+def library_versions() -> Dict[str, str]:
+    """
+    Returns the installed versions of the distributions that provide VERSIONED_MODULES, by distribution
+    name, or "not installed" by module name for a module no installed distribution provides.
+    """
+    distributions = metadata.packages_distributions()
+    versions = {}
+    for module in VERSIONED_MODULES:
+        names = sorted(set(distributions.get(module, ())))
+        if not names:
+            versions[module] = "not installed"
+        for name in names:
+            versions[name] = metadata.version(name)
+    return versions
+
+
+@lru_cache(maxsize=None)
+def versions_digest() -> str:
+    """
+    Returns the SHA-256 of library_versions(), computed once per process: the modules a process has
+    loaded do not change while it runs.
+    """
+    return hashlib.sha256(json.dumps(library_versions(), sort_keys=True).encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Directory of JSON result files, evicted least-recently-used first once it exceeds max_bytes.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.versions = library_versions()
+
+    def key(self, source: str) -> str:
+        """
+        Returns the cache key for an example source under the installed library versions.
+        """
+        digest = hashlib.sha256()
+        digest.update(json.dumps(self.versions, sort_keys=True).encode())
+        digest.update(b"\0")
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, source: str, name: str) -> Optional[ExampleResult]:
+        """
+        Returns the cached result for source, renamed to name and marked as cached, or None on a miss.
+        """
+        path = self._path(self.key(source))
+        try:
+            data = json.loads(path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        os.utime(path)  # Mark as recently used for eviction
+        return ExampleResult(**data)._replace(name=name, cached=True)
+
+    def put(self, source: str, result: ExampleResult) -> None:
+        """
+        Stores a successful result. Failures are not cached so that they are retried.
+        """
+        if result.status != "ok":
+            return
+        path = self._path(self.key(source))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        temp_path.write_text(json.dumps(result._asdict()))
+        os.replace(temp_path, path)  # Atomic, so concurrent readers never see a partial entry
+
+    def evict(self) -> int:
+        """
+        Removes least recently used entries until the cache fits in max_bytes.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        entries = []
+        for path in self.directory.glob("*/*.json"):
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
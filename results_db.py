@@ -0,0 +1,197 @@
+"""
+SQLite store of example results.
+
+Every executed example is recorded under its example id (the file stem, e.g.
+example-01) and the SHA-256 of its source, together with its status, volume,
+properties and telemetry. The annotated copies in examples_executed are rendered
+from this store, and downstream tools (Fusion 360 verification, LLM prompt
+building) can query it directly instead of parsing "# Volume:" comments.
+"""
+import argparse
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from execution import ExampleResult
+from post_processors import annotated_source
+
+DEFAULT_DATABASE = Path("results.sqlite")
+MAX_BOUND_PARAMETERS = 500  # Example ids per query, below SQLite's bound-parameter limit (999 before 3.32)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    example_id TEXT NOT NULL,
+    source_hash TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    source TEXT NOT NULL,
+    status TEXT NOT NULL,
+    volume REAL,
+    result TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (example_id, source_hash)
+);
+CREATE INDEX IF NOT EXISTS results_by_source_hash ON results (source_hash);
+CREATE TABLE IF NOT EXISTS current (
+    example_id TEXT PRIMARY KEY,
+    source_hash TEXT NOT NULL
+);
+"""
+
+
+def source_hash(source: str) -> str:
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+class StoredResult(NamedTuple):
+    """A result row together with the source it was computed from."""
+    example_id: str
+    source_hash: str
+    file_name: str
+    source: str
+    result: ExampleResult
+    recorded_at: float
+
+
+class ResultsDatabase:
+    """
+    Results of every example, keyed by example id and source hash.
+
+    The "current" table points each example id at the source hash of its most
+    recently recorded result, which is what the annotated files are rendered from.
+    """
+
+    def __init__(self, path: Path = DEFAULT_DATABASE) -> None:
+        self.path = Path(path)
+        self.connection = sqlite3.connect(str(self.path))
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self) -> "ResultsDatabase":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def record(self, source: str, result: ExampleResult) -> None:
+        """
+        Stores the result of an example and makes it the current one for its example id.
+        """
+        example_id = Path(result.name).stem
+        digest = source_hash(source)
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    example_id, digest, result.name, source, result.status, result.volume,
+                    json.dumps(result._asdict()), time.time(),
+                ),
+            )
+            self.connection.execute("INSERT OR REPLACE INTO current VALUES (?, ?)", (example_id, digest))
+
+    def _rows(self, query: str, parameters: Iterable[Any] = ()) -> List[StoredResult]:
+        rows = self.connection.execute(query, tuple(parameters)).fetchall()
+        return [
+            StoredResult(example_id, digest, file_name, source, ExampleResult(**json.loads(result)), recorded_at)
+            for example_id, digest, file_name, source, result, recorded_at in rows
+        ]
+
+    def current(self, example_ids: Optional[Iterable[str]] = None) -> List[StoredResult]:
+        """
+        Returns the current result of each example, ordered by example id.
+
+        Args:
+            example_ids (Iterable[str]): Only return these examples (default: all).
+        """
+        query = (
+            "SELECT r.example_id, r.source_hash, r.file_name, r.source, r.result, r.recorded_at "
+            "FROM current c JOIN results r ON r.example_id = c.example_id AND r.source_hash = c.source_hash"
+        )
+        if example_ids is None:
+            return self._rows(query + " ORDER BY r.example_id")
+        wanted = sorted(set(example_ids))
+        rows = []
+        for start in range(0, len(wanted), MAX_BOUND_PARAMETERS):
+            chunk = wanted[start:start + MAX_BOUND_PARAMETERS]
+            placeholders = ", ".join("?" * len(chunk))
+            rows += self._rows(query + f" WHERE r.example_id IN ({placeholders}) ORDER BY r.example_id", chunk)
+        return rows  # The chunks are consecutive ranges of the sorted ids, so the rows stay ordered
+
+    def lookup(self, source: str) -> List[StoredResult]:
+        """
+        Returns every stored result computed from exactly this source.
+        """
+        return self._rows(
+            "SELECT example_id, source_hash, file_name, source, result, recorded_at FROM results "
+            "WHERE source_hash = ? ORDER BY recorded_at DESC",
+            (source_hash(source),),
+        )
+
+    def volumes(self) -> Dict[str, Optional[float]]:
+        """
+        Returns the current volume of every example by example id, None for failed examples.
+        """
+        return {stored.example_id: stored.result.volume for stored in self.current()}
+
+    def render(
+        self,
+        output_dir: Path,
+        example_ids: Optional[Iterable[str]] = None,
+        properties: Iterable[str] = ("volume",),
+    ) -> List[Path]:
+        """
+        Writes the annotated copy of each current example into output_dir.
+
+        Args:
+            output_dir (Path): Directory for the annotated copies.
+            example_ids (Iterable[str]): Only render these examples (default: all).
+            properties (Iterable[str]): Properties to add as comments, when they were measured.
+
+        Returns:
+            list[Path]: The files written.
+        """
+        names = set(properties)
+        written = []
+        for stored in self.current(example_ids):
+            measured = stored.result.properties or {}
+            output_file = Path(output_dir) / stored.file_name
+            output_file.write_text(annotated_source(
+                stored.source,
+                stored.result.volume_text(),
+                {name: value for name, value in measured.items() if name in names},
+            ))
+            written.append(output_file)
+        return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the example results database.")
+    parser.add_argument("--database", type=Path, default=DEFAULT_DATABASE, help="Path of the database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("volumes", help="Print the current volume of every example as JSON")
+    show_parser = subparsers.add_parser("show", help="Print the current result of one example as JSON")
+    show_parser.add_argument("example_id", help="Example id, e.g. example-01")
+    render_parser = subparsers.add_parser("render", help="Write the annotated examples from the database")
+    render_parser.add_argument("output_dir", type=Path, help="Directory for the annotated copies")
+    render_parser.add_argument(
+        "--properties", type=lambda value: tuple(value.split(",")), default=("volume",),
+        help="Comma-separated properties to add as comments (default: volume)"
+    )
+    args = parser.parse_args()
+
+    with ResultsDatabase(args.database) as database:
+        if args.command == "volumes":
+            print(json.dumps(database.volumes(), indent=2))
+        elif args.command == "show":
+            stored = database.current([args.example_id])
+            if not stored:
+                parser.exit(1, f"No result for '{args.example_id}'\n")
+            print(json.dumps(stored[0].result._asdict(), indent=2))
+        else:
+            args.output_dir.mkdir(parents=True, exist_ok=True)
+            for output_file in database.render(args.output_dir, properties=args.properties):
+                print(f"Wrote {output_file}")
@@ -0,0 +1,112 @@
+"""
+Longest-first scheduling of examples from their recorded runtimes.
+
+Handing the slowest examples to the workers first keeps one slow example from
+starting last and running alone while every other worker is idle. The recorded
+runtime is the time spent in the example itself, without interpreter startup and
+its imports, which cost the same for every example and differ between executors.
+Examples without a recorded runtime are estimated from the operations in their source.
+"""
+import json
+import os
+import re
+import statistics
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from execution import ExampleResult
+
+DEFAULT_HISTORY_FILE = Path(".cache") / "build_times.json"  # Renamed when runtimes still included startup
+SMOOTHING = 0.5  # Weight of the newest runtime in the recorded moving average
+
+# Relative cost of build123d operations, used until an example has a recorded runtime
+OPERATION_WEIGHTS: Dict[str, float] = {
+    "Text": 10.0,
+    "offset": 8.0,
+    "fillet": 6.0,
+    "chamfer": 5.0,
+    "loft": 5.0,
+    "sweep": 5.0,
+    "split": 4.0,
+    "revolve": 3.0,
+    "Bezier": 3.0,
+    "mirror": 2.0,
+    "extrude": 2.0,
+    "Hole": 2.0,
+    "CounterBoreHole": 2.0,
+    "CounterSinkHole": 2.0,
+    "PolarLocations": 1.0,
+    "GridLocations": 1.0,
+}
+BASE_COST = 1.0  # Cost of an example that only creates a primitive
+_OPERATION_PATTERN = re.compile(r"\b(" + "|".join(OPERATION_WEIGHTS) + r")\s*\(")
+
+
+def example_runtime(result: ExampleResult) -> float:
+    """
+    Returns the seconds an example itself took: its build time, or for an example stopped before
+    its imports finished timing (timeouts, limits, crashes), its wall time minus the import time.
+    """
+    return result.build_time or max(result.wall_time - result.import_time, 0.0)
+
+
+def estimate_cost(source: str) -> float:
+    """
+    Returns a static estimate of how expensive an example is, in arbitrary units.
+    """
+    return BASE_COST + sum(OPERATION_WEIGHTS[match] for match in _OPERATION_PATTERN.findall(source))
+
+
+class RuntimeHistory:
+    """
+    Runtimes of previously executed examples, persisted as JSON and keyed by file name.
+    """
+
+    def __init__(self, path: Path = DEFAULT_HISTORY_FILE) -> None:
+        self.path = Path(path)
+        try:
+            self.runtimes: Dict[str, float] = json.loads(self.path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.runtimes = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        """
+        Folds a measured runtime into the moving average of an example.
+        """
+        previous = self.runtimes.get(name)
+        if previous is None:
+            self.runtimes[name] = seconds
+        else:
+            self.runtimes[name] = SMOOTHING * seconds + (1 - SMOOTHING) * previous
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        temp_path.write_text(json.dumps(self.runtimes, indent=2, sort_keys=True))
+        os.replace(temp_path, self.path)
+
+    def estimates(self, tasks: Sequence[Tuple[str, str]]) -> List[float]:
+        """
+        Returns the expected runtime in seconds of each (source, name) task.
+
+        Static estimates are scaled to seconds by comparing them with the recorded
+        runtimes of the other examples, so both kinds of estimate can be ranked together.
+        """
+        costs = [estimate_cost(source) for source, _ in tasks]
+        known = [(self.runtimes[name], cost) for (_, name), cost in zip(tasks, costs) if name in self.runtimes]
+        scale = 1.0
+        if known:
+            scale = statistics.median(seconds for seconds, _ in known) / statistics.median(cost for _, cost in known)
+
+        estimates = []
+        for (_, name), cost in zip(tasks, costs):
+            seconds: Optional[float] = self.runtimes.get(name)
+            estimates.append(seconds if seconds is not None else cost * scale)
+        return estimates
+
+    def longest_first(self, tasks: Sequence[Tuple[str, str]]) -> List[int]:
+        """
+        Returns the indices of tasks ordered from the longest to the shortest expected runtime.
+        """
+        estimates = self.estimates(tasks)
+        return sorted(range(len(tasks)), key=lambda index: estimates[index], reverse=True)
@@ -0,0 +1,37 @@
+"""
+Machine-readable per-example performance records.
+
+One JSON object per line, written next to the annotated examples, so runs can be
+compared across build123d releases without parsing the "# Volume:" comments.
+"""
+import json
+from pathlib import Path
+from typing import Dict, Iterable
+
+from execution import ExampleResult
+from result_cache import library_versions
+
+TELEMETRY_FILE_NAME = "telemetry.jsonl"
+
+# ExampleResult fields copied into every record
+TELEMETRY_FIELDS = (
+    "name", "status", "exit_code", "volume", "wall_time", "cpu_time", "import_time", "build_time", "peak_rss_mb",
+    "properties", "cached",
+)
+
+
+def telemetry_record(result: ExampleResult) -> Dict[str, object]:
+    """
+    Returns the telemetry record of one example. For cached results the timings are from the run that produced them.
+    """
+    return {field: getattr(result, field) for field in TELEMETRY_FIELDS}
+
+
+def write_telemetry(path: Path, records: Iterable[Dict[str, object]]) -> None:
+    """
+    Writes telemetry records as JSON lines, each tagged with the installed library versions.
+    """
+    versions = library_versions()
+    with path.open("w") as telemetry_file:
+        for record in records:
+            telemetry_file.write(json.dumps({**record, "versions": versions}) + "\n")
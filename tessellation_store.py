@@ -0,0 +1,213 @@
+"""
+Memory-mapped store of the tessellated parts of the current example results.
+
+All meshes live in one file that is opened with np.memmap, so a viewer,
+comparator or renderer can open thousands of parts at once and only the pages
+of the meshes it actually reads are loaded; nothing is re-tessellated. The
+file holds, for every part, its float32 vertices (n, 3) and then its uint32
+triangles (m, 3), with vertex indices local to the part, followed by a JSON
+index (example id -> source hash and byte ranges), the length of the index as
+uint64 and MAGIC. Keeping the index in the same file lets a rebuild replace
+the file atomically: readers that opened the old file keep a consistent view.
+
+The store is built from the current results in the results database and the
+parts in the artifact store, in parallel worker processes. A rebuild copies the
+meshes of parts whose source hash, tolerance and build123d/OCP versions are
+unchanged from the previous file and tessellates only the others. Needs NumPy, see mesh.py.
+"""
+import argparse
+import json
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from artifacts import DEFAULT_ARTIFACT_DIR, ArtifactStore
+from mesh import DEFAULT_ANGULAR_TOLERANCE, DEFAULT_TOLERANCE, tessellate
+from result_cache import versions_digest
+from results_db import DEFAULT_DATABASE, ResultsDatabase
+
+DEFAULT_TESSELLATION_FILE = Path(".cache") / "tessellations.bin"
+MAGIC = b"TESSIDX1"
+TRAILER = struct.Struct("<Q8s")  # Length of the JSON index, MAGIC
+
+
+class PartRange(NamedTuple):
+    """Where the mesh of one part is in the file."""
+    source_hash: str
+    vertex_offset: int  # Byte offset of the float32 (vertex_count, 3) vertices
+    vertex_count: int
+    triangle_offset: int  # Byte offset of the uint32 (triangle_count, 3) triangles
+    triangle_count: int
+
+
+class TessellationStore:
+    """
+    Read-only view of a tessellation file. Meshes are returned as views on the memory map, without copying.
+    """
+
+    def __init__(self, path: Path = DEFAULT_TESSELLATION_FILE) -> None:
+        self.path = Path(path)
+        self.buffer = np.memmap(self.path, dtype=np.uint8, mode="r")
+        index_length, magic = TRAILER.unpack(self.buffer[-TRAILER.size:].tobytes().rjust(TRAILER.size, b"\0"))
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a tessellation file")
+        index_start = len(self.buffer) - TRAILER.size - index_length
+        index = json.loads(self.buffer[index_start:-TRAILER.size].tobytes())
+        self.tolerance: float = index["tolerance"]
+        self.angular_tolerance: float = index["angular_tolerance"]
+        self.versions: Optional[str] = index.get("versions")  # versions_digest() of the process that built it
+        self.parts: Dict[str, PartRange] = {
+            example_id: PartRange(*values) for example_id, values in index["parts"].items()
+        }
+
+    def __contains__(self, example_id: str) -> bool:
+        return example_id in self.parts
+
+    def __len__(self) -> int:
+        return len(self.parts)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.parts)
+
+    def mesh(self, example_id: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the (n, 3) float32 vertices and (m, 3) uint32 triangles of an example's part.
+        """
+        part = self.parts[example_id]
+        vertices = self.buffer[part.vertex_offset:part.vertex_offset + part.vertex_count * 12]
+        triangles = self.buffer[part.triangle_offset:part.triangle_offset + part.triangle_count * 12]
+        return vertices.view(np.float32).reshape(-1, 3), triangles.view(np.uint32).reshape(-1, 3)
+
+
+def _tessellate_stored(
+    directory: Path, digest: str, tolerance: float, angular_tolerance: float
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    part = ArtifactStore(directory).load(digest)
+    if part is None:
+        return None
+    mesh = tessellate(part, tolerance, angular_tolerance)
+    return mesh.vertices.astype(np.float32), mesh.triangles.astype(np.uint32)
+
+
+def build(
+    path: Path = DEFAULT_TESSELLATION_FILE,
+    database: Path = DEFAULT_DATABASE,
+    artifact_dir: Path = DEFAULT_ARTIFACT_DIR,
+    tolerance: float = DEFAULT_TOLERANCE,
+    angular_tolerance: float = DEFAULT_ANGULAR_TOLERANCE,
+    jobs: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Writes the meshes of the parts of all current successful results to path, reusing the meshes
+    of unchanged parts from the file already there, and tessellating the others from their
+    artifacts in up to jobs worker processes.
+
+    Returns:
+        dict: Number of parts reused and tessellated, and the example ids without a stored part.
+    """
+    with ResultsDatabase(database) as results:
+        current = [
+            (stored.example_id, stored.source_hash) for stored in results.current() if stored.result.status == "ok"
+        ]
+
+    previous = None
+    if path.exists():
+        try:
+            previous = TessellationStore(path)
+        except ValueError:
+            pass  # Not a tessellation file, e.g. from an older format; rebuilt from scratch
+        else:
+            if (previous.tolerance, previous.angular_tolerance, previous.versions) != (
+                tolerance, angular_tolerance, versions_digest()
+            ):
+                previous = None
+
+    def reusable(example_id, digest):
+        return previous is not None and example_id in previous and previous.parts[example_id].source_hash == digest
+
+    missing = [digest for example_id, digest in current if not reusable(example_id, digest)]
+    stats: Dict[str, Any] = {"reused": len(current) - len(missing), "tessellated": 0, "without_artifact": []}
+    parts: Dict[str, List[Any]] = {}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(temp_path, "wb") as file, ProcessPoolExecutor(jobs or os.cpu_count() or 1) as executor:
+        directory = ArtifactStore(artifact_dir).directory
+        arguments = [(directory, digest, tolerance, angular_tolerance) for digest in missing]
+        # Tessellated in parallel; map() hands the meshes back in order, so they are written as they arrive
+        tessellated = executor.map(_tessellate_stored, *zip(*arguments)) if arguments else iter(())
+        for example_id, digest in current:
+            if reusable(example_id, digest):
+                vertices, triangles = previous.mesh(example_id)
+            else:
+                mesh = next(tessellated)
+                if mesh is None:
+                    stats["without_artifact"].append(example_id)
+                    continue
+                vertices, triangles = mesh
+                stats["tessellated"] += 1
+            vertex_offset = file.tell()
+            file.write(np.ascontiguousarray(vertices).data)
+            triangle_offset = file.tell()
+            file.write(np.ascontiguousarray(triangles).data)
+            parts[example_id] = [digest, vertex_offset, len(vertices), triangle_offset, len(triangles)]
+        index = json.dumps({
+            "tolerance": tolerance, "angular_tolerance": angular_tolerance, "versions": versions_digest(), "parts": parts
+        }).encode()
+        file.write(index + TRAILER.pack(len(index), MAGIC))
+    os.replace(temp_path, path)  # Atomic, so readers of the previous file keep a consistent view
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the memory-mapped tessellation store.")
+    parser.add_argument(
+        "--file", type=Path, default=DEFAULT_TESSELLATION_FILE,
+        help=f"Path of the tessellation file (default: {DEFAULT_TESSELLATION_FILE})"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser(
+        "build", help="Tessellate the parts of the current results, reusing unchanged meshes"
+    )
+    build_parser.add_argument("--database", type=Path, default=DEFAULT_DATABASE, help="Path of the results database")
+    build_parser.add_argument(
+        "--artifact-dir", type=Path, default=DEFAULT_ARTIFACT_DIR,
+        help=f"Directory of the artifact store (default: {DEFAULT_ARTIFACT_DIR})"
+    )
+    build_parser.add_argument(
+        "--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Mesh deflection in mm (default: %(default)s)"
+    )
+    build_parser.add_argument(
+        "--angular-tolerance", type=float, default=DEFAULT_ANGULAR_TOLERANCE,
+        help="Mesh angular deflection in radians (default: %(default)s)"
+    )
+    build_parser.add_argument(
+        "-j", "--jobs", type=int, default=os.cpu_count(), help="Worker processes (default: CPU count)"
+    )
+    show_parser = subparsers.add_parser("show", help="Print the mesh size of every part, or of the given ones")
+    show_parser.add_argument("example_ids", nargs="*", help="Example ids, e.g. example-29 (default: all)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        started = time.perf_counter()
+        stats = build(args.file, args.database, args.artifact_dir, args.tolerance, args.angular_tolerance, args.jobs)
+        print(
+            f"Wrote {args.file} in {time.perf_counter() - started:.2f}s: {stats['tessellated']} parts tessellated, "
+            f"{stats['reused']} reused"
+        )
+        for example_id in stats["without_artifact"]:
+            print(f"No artifact for {example_id}; run it again with main2.py --no-cache")
+    else:
+        started = time.perf_counter()
+        store = TessellationStore(args.file)
+        print(f"Opened {len(store)} parts in {(time.perf_counter() - started) * 1000:.1f} ms")
+        for example_id in args.example_ids or store:
+            if example_id not in store:
+                parser.exit(1, f"No mesh for '{example_id}'\n")
+            vertices, triangles = store.mesh(example_id)
+            print(f"{example_id}: {len(vertices)} vertices, {len(triangles)} triangles")
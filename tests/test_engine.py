@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from engine import Engine
+from execution import ExampleResult, RunOptions
+from result_cache import ResultCache
+
+FAST = RunOptions(
+    properties=("volume", "volume_error", "volume_precision"), volume_precision="fast", volume_tolerance=1e-4
+)
+
+
+def _result(precision="fast", error=1e-6, outputs=None, **properties):
+    measured = {"volume": 1000.0, "volume_error": error, "volume_precision": precision, **properties}
+    return ExampleResult("example-01.py", "ok", 1000.0, properties=measured, outputs=outputs)
+
+
+@pytest.mark.parametrize("result, complete", [
+    (_result("fast"), True),
+    (_result("exact", 1e-10), True),
+    (_result("default", None), False),  # Less precise than requested
+    (_result("fast", 1e-3), False),  # Estimate above the requested tolerance
+    (ExampleResult("example-01.py", "ok", 1000.0, properties={"volume": 1000.0}), False),  # Missing properties
+])
+def test_cached_result_is_complete_only_if_precise_enough(result, complete):
+    assert Engine("inline", options=FAST)._is_complete(result) is complete
+
+
+def test_cached_result_needs_every_post_processor_output():
+    engine = Engine("inline", options=FAST._replace(post_processors=("properties", "validity")))
+    assert not engine._is_complete(_result())
+    assert engine._is_complete(_result(outputs={"validity": {"is_valid": True}}))
+
+
+def test_default_precision_reuses_any_volume():
+    engine = Engine("inline", options=RunOptions())
+    assert engine._is_complete(_result("default", None))
+    assert engine._is_complete(_result("fast", 1e-3))
+
+
+def test_cache_round_trip_and_failures_are_not_cached(tmp_path):
+    cache = ResultCache(tmp_path)
+    cache.put("part = 1", ExampleResult("a.py", "ok", 1.0))
+    cache.put("part = 2", ExampleResult("b.py", "error", message="boom"))
+    assert cache.get("part = 1", "renamed.py") == ExampleResult("renamed.py", "ok", 1.0, cached=True)
+    assert cache.get("part = 2", "b.py") is None
+
+
+def test_evict_removes_least_recently_used_entries(tmp_path):
+    sources = [f"part = {index}" for index in range(4)]
+    cache = ResultCache(tmp_path)
+    for age, source in enumerate(sources):
+        cache.put(source, ExampleResult(f"{age}.py", "ok", float(age)))
+        path = cache._path(cache.key(source))
+        os.utime(path, (1000 + age, 1000 + age))
+    entry_size = cache._path(cache.key(sources[0])).stat().st_size
+    cache.get(sources[0], "0.py")  # Now the most recently used
+
+    cache.max_bytes = 2 * entry_size + entry_size // 2
+    assert cache.evict() == 2
+    assert cache.get(sources[1], "1.py") is None and cache.get(sources[2], "2.py") is None
+    assert cache.get(sources[0], "0.py") is not None and cache.get(sources[3], "3.py") is not None
+    assert cache.evict() == 0
+
+
+def test_engine_reuses_complete_cached_results_only(tmp_path):
+    pytest.importorskip("build123d")
+    source = "from build123d import *\npart = Box(1, 2, 3)\n"
+    cache = ResultCache(tmp_path)
+    first = Engine("inline", options=RunOptions(), cache=cache).run([(source, "a.py")])[0]
+    again = Engine("inline", options=RunOptions(), cache=cache).run([(source, "a.py")])[0]
+    precise = Engine("inline", options=FAST, cache=cache).run([(source, "a.py")])[0]
+    assert not first.cached and again.cached and again.volume == first.volume
+    assert not precise.cached and precise.properties["volume_precision"] in ("fast", "exact")
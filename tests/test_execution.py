@@ -0,0 +1,16 @@
+import pytest
+
+from execution import run_source
+
+
+@pytest.mark.parametrize("call, exit_code", [("sys.exit(3)", 3), ("sys.exit('bye')", 1), ("sys.exit()", 0)])
+def test_exit_is_recorded_as_error(call, exit_code):
+    result = run_source(f"import sys\n{call}\n", "example-exit.py")
+    assert result.status == "error"
+    assert result.exit_code == exit_code
+    assert "SystemExit" in result.message
+
+
+def test_keyboard_interrupt_is_not_caught():
+    with pytest.raises(KeyboardInterrupt):
+        run_source("raise KeyboardInterrupt\n", "example-interrupt.py")
@@ -0,0 +1,99 @@
+import re
+import threading
+from pathlib import Path
+
+import pytest
+
+import incremental
+from execution import RunOptions, run_source
+
+pytest.importorskip("build123d")
+
+EXAMPLES = Path(__file__).parent.parent / "examples"
+
+SOURCE = """from build123d import *
+
+length, width = 40, 30
+with BuildPart() as plate:
+    Box(length, width, 10)
+    with BuildSketch(plate.faces().sort_by(Axis.Z)[-1]):
+        Circle(8)
+    extrude(amount=5)
+    with Locations((12, 0, 0)):
+        Hole(3)
+    fillet(plate.edges().filter_by(Axis.Z), radius=2)
+    chamfer(plate.faces().sort_by(Axis.Z)[-1].edges(), length=0.5)
+part = plate.part
+"""
+
+# (original, replacement) edits at every depth of the example, from the constants to the last builder statement
+EDITS = [
+    ("length, width = 40, 30", "length, width = 50, 30"),
+    ("Box(length, width, 10)", "Box(length, width, 12)"),
+    ("Circle(8)", "Circle(6)"),
+    ("amount=5", "amount=7"),
+    ("(12, 0, 0)", "(-12, 4, 0)"),
+    ("Hole(3)", "Hole(4)"),
+    ("radius=2", "radius=3"),
+    ("length=0.5", "length=1"),
+    ("    chamfer(", "    # A comment\n    chamfer("),
+    ("part = plate.part", "part = plate.part.rotate(Axis.Z, 90)"),
+]
+
+
+def _resumed(source, name):
+    return run_source(source, name, options=RunOptions(properties=("volume", "area"), incremental=64))
+
+
+def _fresh(source, name):
+    return run_source(source, name, options=RunOptions(properties=("volume", "area")))
+
+
+@pytest.mark.parametrize("original, replacement", EDITS)
+def test_resumed_run_matches_fresh_run(original, replacement):
+    name = "example-incremental.py"
+    _resumed(SOURCE, name)
+    edited = SOURCE.replace(original, replacement)
+    resumed = _resumed(edited, name)
+    fresh = _fresh(edited, name)
+    assert resumed.status == fresh.status == "ok", resumed.message
+    # Only an edit of the first statement leaves no unchanged prefix to resume from
+    assert (resumed.outputs["incremental"]["resumed_line"] is None) == (original == EDITS[0][0])
+    assert resumed.properties["volume"] == pytest.approx(fresh.properties["volume"], rel=1e-9)
+    assert resumed.properties["area"] == pytest.approx(fresh.properties["area"], rel=1e-9)
+
+
+def test_resumed_runs_match_fresh_runs_in_any_order():
+    name = "example-incremental-order.py"
+    sources = [SOURCE.replace(original, replacement) for original, replacement in EDITS]
+    fresh = [_fresh(source, name).properties["volume"] for source in sources]
+    for order in (sources, sources[::-1]):
+        volumes = {source: _resumed(source, name).properties["volume"] for source in order}
+        assert [volumes[source] for source in sources] == pytest.approx(fresh, rel=1e-9)
+
+
+def test_counters_are_exact_under_concurrent_runs():
+    store = incremental.install(64)
+    before = store.hits + store.misses
+    threads = [threading.Thread(target=store.count, args=("hits" if i % 2 else "misses",)) for i in range(200)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.hits + store.misses == before + 200
+
+
+@pytest.mark.parametrize("path", sorted(EXAMPLES.glob("example-*.py")), ids=lambda path: path.stem)
+def test_corpus_edit_resumes_to_fresh_result(path):
+    source = path.read_text()
+    numbers = list(re.finditer(r"(?<![\w.])\d+(\.\d+)?(?![\w.])", source))
+    if not numbers:
+        pytest.skip("No numeric literal to edit")
+    last = numbers[-1]
+    edited = source[:last.start()] + str(float(last.group()) * 1.1) + source[last.end():]
+    _resumed(source, path.name)
+    resumed, fresh = _resumed(edited, path.name), _fresh(edited, path.name)
+    assert resumed.status == fresh.status
+    if fresh.status == "ok":
+        assert resumed.properties["volume"] == pytest.approx(fresh.properties["volume"], rel=1e-9)
+        assert resumed.properties["area"] == pytest.approx(fresh.properties["area"], rel=1e-9)
@@ -0,0 +1,49 @@
+from pathlib import Path
+
+import pytest
+
+from execution import RunOptions
+from worker_pool import WorkerPool
+
+pytest.importorskip("build123d")
+
+EXAMPLES = sorted((Path(__file__).parent.parent / "examples").glob("example-*.py"))
+OPTIONS = RunOptions(properties=("volume", "area", "center_of_mass", "faces"))
+
+
+@pytest.fixture(scope="module")
+def tasks():
+    return [(path.read_text(), path.name) for path in EXAMPLES]
+
+
+@pytest.fixture(scope="module")
+def fresh(tasks):
+    # A worker process of its own, so no memo installed by another test can leak into the reference
+    with WorkerPool(1, options=OPTIONS) as pool:
+        return {result.name: result for result in pool.map(tasks)}
+
+
+def _assert_matches(result, reference):
+    assert result.status == reference.status, result.message
+    if reference.status != "ok":
+        return
+    assert result.volume == pytest.approx(reference.volume, rel=1e-9)
+    assert result.properties["area"] == pytest.approx(reference.properties["area"], rel=1e-9)
+    assert result.properties["center_of_mass"] == pytest.approx(reference.properties["center_of_mass"], abs=1e-6)
+    assert result.properties["faces"] == reference.properties["faces"]
+
+
+def test_memoized_results_match_fresh_results_in_any_order(tasks, fresh):
+    # One worker, so the second pass over the corpus hits what the first pass cached
+    with WorkerPool(1, options=OPTIONS._replace(memoize=4096)) as pool:
+        forward = pool.map(tasks)
+        backward = pool.map(tasks[::-1])
+    for result in forward + backward:
+        _assert_matches(result, fresh[result.name])
+    assert sum(result.outputs["memoization"]["hits"] for result in backward) > 0
+
+
+def test_evicting_memo_keeps_results_correct(tasks, fresh):
+    with WorkerPool(1, options=OPTIONS._replace(memoize=8)) as pool:
+        for result in pool.map(tasks) + pool.map(tasks[::-1]):
+            _assert_matches(result, fresh[result.name])
@@ -0,0 +1,35 @@
+import math
+
+import pytest
+
+from part_properties import DEFAULT_VOLUME_TOLERANCE, EXACT_ERROR, VOLUME_PRECISIONS, extract_properties
+
+build123d = pytest.importorskip("build123d")
+
+
+def test_default_volume_is_part_volume():
+    box = build123d.Box(10, 10, 10)
+    loose_face = build123d.Face.make_rect(5, 5).moved(build123d.Location((30, 0, 0)))
+    for part in (box, build123d.Compound([box.solids()[0], loose_face]), build123d.Sphere(5)):
+        assert extract_properties(part, ["volume"])["volume"] == part.volume
+
+
+@pytest.mark.parametrize("precision", VOLUME_PRECISIONS)
+def test_volume_ignores_loose_faces(precision):
+    box = build123d.Box(10, 10, 10)
+    loose_face = build123d.Face.make_rect(5, 5).moved(build123d.Location((30, 0, 0)))
+    compound = build123d.Compound([box.solids()[0], loose_face])
+    assert extract_properties(compound, ["volume"], precision)["volume"] == pytest.approx(1000)
+
+
+@pytest.mark.parametrize("precision", ["fast", "exact"])
+def test_volume_error_bounds_actual_error(precision):
+    torus = build123d.Torus(20, 5)
+    properties = extract_properties(torus, ["volume", "volume_error", "volume_precision"], precision)
+    actual = 2 * math.pi ** 2 * 20 * 5 ** 2
+    assert abs(properties["volume"] - actual) / actual <= properties["volume_error"]
+    if precision == "exact":
+        assert properties["volume_precision"] == "exact" and properties["volume_error"] <= EXACT_ERROR
+    else:
+        assert properties["volume_precision"] in ("fast", "exact")
+        assert properties["volume_error"] <= DEFAULT_VOLUME_TOLERANCE
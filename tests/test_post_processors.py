@@ -0,0 +1,43 @@
+import math
+
+import pytest
+
+from execution import RunOptions
+from post_processors import PostContext, check_mesh
+
+build123d = pytest.importorskip("build123d")
+pytest.importorskip("numpy")
+
+# Parts with a known volume, including extruded curves, where the mesher's own deflection estimate is off
+PARTS = {
+    "cylinder": (lambda: build123d.Cylinder(10, 20), math.pi * 10 ** 2 * 20),
+    "sphere": (lambda: build123d.Sphere(7), 4 / 3 * math.pi * 7 ** 3),
+    "torus": (lambda: build123d.Torus(20, 5), 2 * math.pi ** 2 * 20 * 5 ** 2),
+    "extruded arc": (
+        lambda: build123d.extrude(build123d.Circle(10) - build123d.Circle(9.5), amount=3),
+        math.pi * (10 ** 2 - 9.5 ** 2) * 3,
+    ),
+}
+
+
+def _check(part, options, properties=None):
+    return check_mesh(part, PostContext("part.py", "", options, {"properties": properties} if properties else {}))
+
+
+@pytest.mark.parametrize("name", PARTS)
+@pytest.mark.parametrize("options", [RunOptions(), RunOptions(volume_precision="exact")], ids=["default", "exact"])
+def test_mesh_volume_is_within_its_bound(name, options):
+    make, volume = PARTS[name]
+    checked = _check(make(), options)
+    assert abs(checked["volume"] - volume) <= checked["volume_bound"]
+    assert checked["disagreements"] == []
+
+
+@pytest.mark.parametrize("name", PARTS)
+def test_wrong_kernel_volume_is_flagged(name):
+    make, volume = PARTS[name]
+    part = make()
+    checked = _check(part, RunOptions())
+    wrong = volume + 2 * checked["volume_bound"] + 1e-6 * volume
+    properties = {"volume": wrong, "area": part.area, "center_of_mass": checked["center_of_mass"]}
+    assert _check(part, RunOptions(), properties)["disagreements"] == ["volume"]
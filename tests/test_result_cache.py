@@ -0,0 +1,9 @@
+import pytest
+
+from result_cache import VERSIONED_MODULES, library_versions
+
+
+@pytest.mark.parametrize("module", VERSIONED_MODULES)
+def test_library_versions_are_resolved(module):
+    pytest.importorskip(module)
+    assert "not installed" not in library_versions().values()
@@ -0,0 +1,33 @@
+from execution import ExampleResult
+from results_db import MAX_BOUND_PARAMETERS, ResultsDatabase
+
+
+def test_latest_recorded_result_is_current(tmp_path):
+    with ResultsDatabase(tmp_path / "results.sqlite") as database:
+        database.record("part = 1", ExampleResult("example-01.py", "ok", 1.0))
+        database.record("part = 2", ExampleResult("example-01.py", "ok", 2.0))
+        database.record("part = 3", ExampleResult("example-02.py", "error", message="boom"))
+        assert database.volumes() == {"example-01": 2.0, "example-02": None}
+        assert [stored.result.volume for stored in database.lookup("part = 1")] == [1.0]
+        database.record("part = 1", ExampleResult("example-01.py", "ok", 1.0))  # Reverting an edit
+        assert database.volumes()["example-01"] == 1.0
+
+
+def test_current_of_many_ids_is_complete_and_ordered(tmp_path):
+    count = 2 * MAX_BOUND_PARAMETERS + 7
+    with ResultsDatabase(tmp_path / "results.sqlite") as database:
+        for index in range(count):
+            database.record(f"part = {index}", ExampleResult(f"example-{index:04d}.py", "ok", float(index)))
+        wanted = [f"example-{index:04d}" for index in range(count - 1, 0, -2)] + ["example-missing"]
+        assert [stored.example_id for stored in database.current(wanted)] == sorted(wanted[:-1])
+
+
+def test_render_writes_annotated_current_sources(tmp_path):
+    with ResultsDatabase(tmp_path / "results.sqlite") as database:
+        database.record("part = 1\n", ExampleResult("example-01.py", "ok", 1.5, properties={"area": 6.0}))
+        database.record("part = 2\n", ExampleResult("example-02.py", "timeout"))
+        written = database.render(tmp_path, properties=("volume", "area"))
+    assert [path.name for path in written] == ["example-01.py", "example-02.py"]
+    first, second = (path.read_text() for path in written)
+    assert "# Volume: 1.5 mm^3" in first and "# Area: 6.0 mm^2" in first and "part = 1" in first
+    assert "# Volume: Error during execution (timeout) mm^3" in second
@@ -0,0 +1,37 @@
+import pytest
+
+from execution import ExampleResult
+from scheduler import BASE_COST, OPERATION_WEIGHTS, SMOOTHING, RuntimeHistory, estimate_cost, example_runtime
+
+
+def test_estimate_counts_weighted_operations():
+    source = "Box(1, 1, 1)\nfillet(edges, radius=1)\nextrude (amount=2)\nextrude(amount=3)\n"
+    assert estimate_cost(source) == BASE_COST + OPERATION_WEIGHTS["fillet"] + 2 * OPERATION_WEIGHTS["extrude"]
+
+
+def test_longest_first_ranks_recorded_and_estimated_runtimes_together(tmp_path):
+    history = RuntimeHistory(tmp_path / "build_times.json")
+    history.record("slow.py", 4.0)
+    history.record("quick.py", 0.5)
+    tasks = [
+        ("Box(1, 1, 1)", "quick.py"),
+        ("Text('a')\noffset(part, 1)", "unknown-heavy.py"),  # Estimated at 19 units
+        ("Box(1, 1, 1)", "slow.py"),
+        ("Box(1, 1, 1)", "unknown-light.py"),  # Estimated at 1 unit
+    ]
+    # Both recorded examples cost 1 unit, so a unit is scaled to the median of 2.25 s
+    assert history.estimates(tasks)[1] == pytest.approx(19 * 2.25)
+    assert history.longest_first(tasks) == [1, 2, 3, 0]
+
+
+def test_history_is_smoothed_and_persisted(tmp_path):
+    history = RuntimeHistory(tmp_path / "build_times.json")
+    history.record("a.py", 2.0)
+    history.record("a.py", 4.0)
+    history.save()
+    assert RuntimeHistory(tmp_path / "build_times.json").runtimes == {"a.py": SMOOTHING * 4.0 + (1 - SMOOTHING) * 2.0}
+
+
+def test_runtime_excludes_imports():
+    assert example_runtime(ExampleResult("a.py", "ok", wall_time=5.0, import_time=4.0, build_time=0.8)) == 0.8
+    assert example_runtime(ExampleResult("a.py", "timeout", wall_time=5.0, import_time=4.0)) == 1.0
@@ -0,0 +1,39 @@
+import pytest
+
+from execution import Limits
+from worker_pool import RecyclePolicy, WorkerPool
+
+pytest.importorskip("build123d")
+
+BOX = ("from build123d import *\npart = Box(1, 2, 3)\n", "box.py")
+LOOP = ("from build123d import *\nwhile True:\n    pass\n", "loop.py")
+CRASH = ("import os\nos._exit(7)\n", "crash.py")
+
+
+def _pids(pool):
+    return [worker.process.pid for worker in pool.workers]
+
+
+def test_worker_over_timeout_is_killed_and_replaced():
+    with WorkerPool(1, limits=Limits(timeout=1)) as pool:
+        before = _pids(pool)
+        loop, box = pool.map([LOOP, BOX])
+        assert loop.status == "timeout"
+        assert box.status == "ok" and box.volume == pytest.approx(6)
+        assert _pids(pool) != before
+
+
+def test_crashed_worker_is_reported_and_replaced():
+    with WorkerPool(1) as pool:
+        crash, box = pool.map([CRASH, BOX])
+        assert crash.status == "error" and crash.exit_code == 7
+        assert box.status == "ok"
+
+
+def test_workers_are_recycled_after_max_tasks():
+    with WorkerPool(1, recycle=RecyclePolicy(max_tasks=2)) as pool:
+        before = _pids(pool)
+        results = pool.map([BOX] * 5)
+        assert [result.status for result in results] == ["ok"] * 5
+        assert pool.recycled == 2
+        assert _pids(pool) != before
@@ -0,0 +1,325 @@
+"""
+Headless thumbnails and a contact sheet of the example corpus.
+
+Every part is tessellated (see mesh.py) and rasterized on the CPU with NumPy:
+the triangles are projected in an isometric view, every pixel a triangle may
+cover is generated at once, and a z-buffer keeps the nearest triangle per pixel.
+Triangles are flat-shaded by the angle to the light, and rendered at twice the
+size and averaged down to smooth the edges. PNG files are encoded with zlib and
+struct, so no GPU, display or imaging library is needed.
+
+Thumbnails are stored in the artifact store as <hash>.<size>px.png, keyed by the
+source hash like the parts, so an unchanged example is never rendered twice.
+Parts come from the artifact store too; examples without a stored part are
+executed first. Thumbnails are rendered in parallel worker processes.
+
+The contact sheet shows each example next to its counterparts with the same
+file name in the other directories, e.g. LLM translations of the examples back
+to build123d. Cells of examples that failed are tinted red, missing ones grey.
+Needs NumPy, see mesh.py.
+"""
+import argparse
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from artifacts import DEFAULT_ARTIFACT_DIR, ArtifactStore
+from mesh import tessellate
+from results_db import source_hash
+
+DEFAULT_SIZE = 160  # Thumbnail width and height in pixels
+SUPERSAMPLING = 2  # Rendered at this multiple of the size and averaged down
+VIEW_DIRECTION = (1.0, -1.0, 1.0)  # From the part towards the viewer: isometric from the front right
+LIGHT_DIRECTION = (0.4, -0.7, 1.0)
+PART_COLOR = np.array([70, 130, 180], dtype=np.float64)
+BACKGROUND = (255, 255, 255)
+FAILED_COLOR = (250, 215, 215)
+MISSING_COLOR = (235, 235, 235)
+LABEL_COLOR = (60, 60, 60)
+ANGULAR_TOLERANCE = 0.2  # Finer than mesh.DEFAULT_ANGULAR_TOLERANCE, so flat-shaded round parts look round
+CANDIDATES_PER_CHUNK = 1 << 20  # Pixel candidates generated at once, to bound memory on large triangles
+# 3x5 digits for the example numbers on the contact sheet, row by row
+DIGITS = {
+    "0": "111101101101111", "1": "010110010010111", "2": "111001111100111", "3": "111001111001111",
+    "4": "101101111001001", "5": "111100111001111", "6": "111100111101111", "7": "111001001001001",
+    "8": "111101111101111", "9": "111101111001111",
+}
+
+
+def _unit(vector: Tuple[float, float, float]) -> np.ndarray:
+    array = np.array(vector, dtype=np.float64)
+    return array / np.linalg.norm(array)
+
+
+def render(vertices: np.ndarray, triangles: np.ndarray, size: int = DEFAULT_SIZE) -> np.ndarray:
+    """
+    Rasterizes a mesh in an isometric view and returns the (size, size, 3) uint8 RGB image.
+    """
+    towards_viewer = _unit(VIEW_DIRECTION)
+    right = _unit(np.cross((0.0, 0.0, 1.0), towards_viewer))
+    up = np.cross(towards_viewer, right)
+    view = np.stack([right, up, towards_viewer])
+    points = np.asarray(vertices, dtype=np.float64) @ view.T  # Screen x, screen y, depth towards the viewer
+
+    scaled = size * SUPERSAMPLING
+    image = np.empty((scaled, scaled, 3), dtype=np.float64)
+    image[:] = BACKGROUND
+    if len(triangles):
+        low, high = points[:, :2].min(axis=0), points[:, :2].max(axis=0)
+        margin = 0.05 * scaled
+        scale = (scaled - 2 * margin) / max((high - low).max(), 1e-12)
+        center = (low + high) / 2
+        points[:, 0] = scaled / 2 + (points[:, 0] - center[0]) * scale
+        points[:, 1] = scaled / 2 - (points[:, 1] - center[1]) * scale  # Image rows grow downwards
+        points[:, 2] *= scale  # Scaled like x and y, so the normals below are not distorted
+
+        corners = points[np.asarray(triangles, dtype=np.int64)]
+        normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        # The y flip mirrors the view, so outward normals point away from the viewer: negate them
+        lengths = np.linalg.norm(normals, axis=1)
+        normals = -normals / np.where(lengths > 0, lengths, 1)[:, None]
+        light = _unit(LIGHT_DIRECTION) @ view.T * (1, -1, 1)
+        shades = 0.35 + 0.65 * np.clip(normals @ light, 0, 1)
+        depth, shade = _rasterize(corners, shades, scaled)
+        covered = depth > -np.inf
+        image[covered] = PART_COLOR * shade[covered, None]
+    image = image.reshape(size, SUPERSAMPLING, size, SUPERSAMPLING, 3).mean(axis=(1, 3))
+    return np.clip(np.rint(image), 0, 255).astype(np.uint8)
+
+
+def _rasterize(corners: np.ndarray, shades: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Z-buffers screen-space triangles (m, 3, 3) and returns the depth and shade of every pixel,
+    -inf depth where no triangle covers it.
+    """
+    depth = np.full(size * size, -np.inf)
+    shade = np.zeros(size * size)
+    x, y, z = corners[:, :, 0], corners[:, :, 1], corners[:, :, 2]
+    area = (x[:, 1] - x[:, 0]) * (y[:, 2] - y[:, 0]) - (x[:, 2] - x[:, 0]) * (y[:, 1] - y[:, 0])
+    x_min = np.clip(np.floor(x.min(axis=1)), 0, size - 1).astype(np.int64)
+    x_max = np.clip(np.ceil(x.max(axis=1)), 0, size - 1).astype(np.int64)
+    y_min = np.clip(np.floor(y.min(axis=1)), 0, size - 1).astype(np.int64)
+    y_max = np.clip(np.ceil(y.max(axis=1)), 0, size - 1).astype(np.int64)
+    widths = x_max - x_min + 1
+    counts = np.where(area != 0, widths * (y_max - y_min + 1), 0)  # Edge-on triangles cover nothing
+
+    ends = np.cumsum(counts)
+    start = 0
+    while start < len(counts):
+        stop = max(int(np.searchsorted(ends, ends[start] - counts[start] + CANDIDATES_PER_CHUNK, "right")), start + 1)
+        chunk = np.arange(start, stop)
+        triangle = np.repeat(chunk, counts[chunk])
+        offsets = np.arange(len(triangle)) - np.repeat(np.cumsum(counts[chunk]) - counts[chunk], counts[chunk])
+        column = x_min[triangle] + offsets % widths[triangle]
+        row = y_min[triangle] + offsets // widths[triangle]
+        center_x, center_y = column + 0.5, row + 0.5
+        tx, ty = x[triangle], y[triangle]
+        weight0 = ((tx[:, 1] - center_x) * (ty[:, 2] - center_y) - (tx[:, 2] - center_x) * (ty[:, 1] - center_y))
+        weight1 = ((tx[:, 2] - center_x) * (ty[:, 0] - center_y) - (tx[:, 0] - center_x) * (ty[:, 2] - center_y))
+        weight0, weight1 = weight0 / area[triangle], weight1 / area[triangle]
+        weight2 = 1 - weight0 - weight1
+        inside = (weight0 >= 0) & (weight1 >= 0) & (weight2 >= 0)
+        triangle, pixel = triangle[inside], (row * size + column)[inside]
+        candidate_depth = (z[triangle] * np.stack([weight0, weight1, weight2], axis=1)[inside]).sum(axis=1)
+
+        # Keep the nearest candidate per pixel, then only where it is nearer than earlier chunks
+        order = np.lexsort((candidate_depth, pixel))
+        last = np.append(pixel[order][1:] != pixel[order][:-1], True)
+        nearest = order[last]
+        nearer = candidate_depth[nearest] > depth[pixel[nearest]]
+        nearest = nearest[nearer]
+        depth[pixel[nearest]] = candidate_depth[nearest]
+        shade[pixel[nearest]] = shades[triangle[nearest]]
+        start = stop
+    return depth.reshape(size, size), shade.reshape(size, size)
+
+
+def encode_png(image: np.ndarray) -> bytes:
+    """
+    Returns an 8-bit RGB image (height, width, 3) as PNG.
+    """
+    height, width, _ = image.shape
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    rows = np.concatenate([np.zeros((height, 1), dtype=np.uint8), image.reshape(height, -1)], axis=1)  # Filter 0
+    return b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+        chunk(b"IDAT", zlib.compress(rows.tobytes(), 6)),
+        chunk(b"IEND", b""),
+    ))
+
+
+def decode_png(data: bytes) -> np.ndarray:
+    """
+    Returns the pixels of a PNG written by encode_png().
+    """
+    width, height = struct.unpack(">II", data[16:24])
+    compressed, position = b"", 8
+    while position < len(data):
+        length, kind = struct.unpack(">I4s", data[position:position + 8])
+        if kind == b"IDAT":
+            compressed += data[position + 8:position + 8 + length]
+        position += length + 12
+    rows = np.frombuffer(zlib.decompress(compressed), dtype=np.uint8).reshape(height, 3 * width + 1)
+    return rows[:, 1:].reshape(height, width, 3)
+
+
+def thumbnail_suffix(size: int) -> str:
+    return f".{size}px.png"
+
+
+def _thumbnail(
+    directory: Path, source: str, name: str, size: int, timeout: Optional[float]
+) -> Tuple[str, Optional[str]]:
+    """
+    Renders the thumbnail of one example in a worker process.
+
+    Returns:
+        tuple: "ok" and the path of the thumbnail, or the status and error message of the example.
+    """
+    from execution import RunOptions, run_source
+
+    store = ArtifactStore(directory)
+    digest = source_hash(source)
+    part = store.load(digest)
+    if part is None:
+        options = RunOptions(post_processors=("artifact",), artifact_dir=str(directory))
+        result = run_source(source, name, timeout, options)
+        if result.status != "ok":
+            return result.status, result.message
+        part = store.load(digest)
+    # Half a pixel of deflection is invisible, and keeps large parts cheap to mesh
+    tolerance = max(part.bounding_box().diagonal / size / 2, 1e-3)
+    mesh = tessellate(part, tolerance, ANGULAR_TOLERANCE)
+    png = encode_png(render(mesh.vertices, mesh.triangles, size))
+    return "ok", str(store.save_bytes(digest, thumbnail_suffix(size), png))
+
+
+def render_thumbnails(
+    files: List[Path],
+    store: ArtifactStore,
+    size: int = DEFAULT_SIZE,
+    jobs: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Dict[Path, Tuple[str, Optional[str]]]:
+    """
+    Returns the thumbnail of every example file, rendering the ones not cached yet in up to jobs processes.
+
+    Returns:
+        dict: By file, "cached" or "ok" and the path of the thumbnail, or the status and error
+        message of an example that failed.
+    """
+    thumbnails: Dict[Path, Tuple[str, Optional[str]]] = {}
+    pending = {}
+    for path in files:
+        source = path.read_text()
+        cached = store.path(source_hash(source), thumbnail_suffix(size))
+        if cached.exists():
+            thumbnails[path] = ("cached", str(cached))
+        else:
+            pending[path] = source
+    if pending:
+        with ProcessPoolExecutor(min(jobs or os.cpu_count() or 1, len(pending))) as executor:
+            futures = {
+                executor.submit(_thumbnail, store.directory, source, path.name, size, timeout): path
+                for path, source in pending.items()
+            }
+            for future in as_completed(futures):
+                thumbnails[futures[future]] = future.result()
+    return thumbnails
+
+
+def _label(cell: np.ndarray, text: str, scale: int = 2) -> None:
+    """
+    Draws the digits of text in the top left corner of cell.
+    """
+    x = 2 * scale
+    for character in text:
+        if character not in DIGITS:
+            continue
+        glyph = np.array([int(bit) for bit in DIGITS[character]], dtype=bool).reshape(5, 3)
+        glyph = glyph.repeat(scale, axis=0).repeat(scale, axis=1)
+        cell[2 * scale:2 * scale + glyph.shape[0], x:x + glyph.shape[1]][glyph] = LABEL_COLOR
+        x += 4 * scale
+
+
+def contact_sheet(
+    rows: List[Tuple[str, List[Optional[Tuple[str, Optional[str]]]]]], size: int = DEFAULT_SIZE, columns: int = 6
+) -> np.ndarray:
+    """
+    Lays out groups of thumbnails, columns groups per row, and returns the sheet as an RGB image.
+
+    Args:
+        rows (list): (label, thumbnails) per example; each thumbnail is a render_thumbnails() value,
+            or None if the example has no counterpart in that directory.
+    """
+    per_group = max(len(thumbnails) for _, thumbnails in rows)
+    gap = max(size // 16, 2)
+    group_width = per_group * size + gap
+    sheet_rows = -(-len(rows) // columns)
+    sheet = np.empty((sheet_rows * (size + gap) + gap, columns * group_width + gap, 3), dtype=np.uint8)
+    sheet[:] = BACKGROUND
+    for index, (label, thumbnails) in enumerate(rows):
+        top = gap + (index // columns) * (size + gap)
+        left = gap + (index % columns) * group_width
+        for position, thumbnail in enumerate(thumbnails):
+            cell = sheet[top:top + size, left + position * size:left + (position + 1) * size]
+            if thumbnail is None:
+                cell[:] = MISSING_COLOR
+            elif thumbnail[0] in ("ok", "cached"):
+                cell[:] = decode_png(Path(thumbnail[1]).read_bytes())
+            else:
+                cell[:] = FAILED_COLOR
+            _label(cell, label, max(size // 60, 1))
+    return sheet
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render thumbnails of the examples and a contact sheet.")
+    parser.add_argument(
+        "directories", type=Path, nargs="+",
+        help="Example directories; examples with the same file name are shown side by side, e.g. examples translated"
+    )
+    parser.add_argument("-o", "--output", type=Path, default=Path("contact_sheet.png"), help="Contact sheet PNG")
+    parser.add_argument(
+        "--size", type=int, default=DEFAULT_SIZE, help="Thumbnail size in pixels (default: %(default)s)"
+    )
+    parser.add_argument("--columns", type=int, default=6, help="Examples per contact sheet row (default: %(default)s)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="Worker processes (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds per example to execute (default: 120)")
+    parser.add_argument(
+        "--artifact-dir", type=Path, default=DEFAULT_ARTIFACT_DIR,
+        help=f"Artifact store of the parts and thumbnails (default: {DEFAULT_ARTIFACT_DIR})"
+    )
+    args = parser.parse_args()
+
+    names = sorted({
+        path.name for directory in args.directories for path in directory.glob("*.py") if path.is_file()
+    })
+    files = [directory / name for name in names for directory in args.directories if (directory / name).is_file()]
+    started = time.perf_counter()
+    thumbnails = render_thumbnails(files, ArtifactStore(args.artifact_dir), args.size, args.jobs, args.timeout)
+    rendered = sum(status == "ok" for status, _ in thumbnails.values())
+    cached = sum(status == "cached" for status, _ in thumbnails.values())
+    for path, (status, message) in thumbnails.items():
+        if status not in ("ok", "cached"):
+            print(f"{path}: {status}: {''.join((message or '').strip().splitlines()[-1:])}")
+
+    rows: List[Tuple[str, List[Any]]] = []
+    for name in names:
+        label = "".join(character for character in Path(name).stem if character.isdigit())
+        rows.append((label, [thumbnails.get(directory / name) for directory in args.directories]))
+    args.output.write_bytes(encode_png(contact_sheet(rows, args.size, args.columns)))
+    print(
+        f"Wrote {args.output} with {len(names)} examples in {time.perf_counter() - started:.2f}s "
+        f"({rendered} thumbnails rendered, {cached} cached)"
+    )
@@ -0,0 +1,230 @@
+"""
+Persistent worker processes that import build123d once.
+
+Running every example in a fresh interpreter means every example pays for
+``from build123d import *`` and the OCP extension modules. Workers started
+here pay that cost once and then execute example sources sent over a pipe.
+
+OCC accumulates memory over many operations, so workers can be recycled after a
+number of tasks or once their resident memory crosses a threshold. A spare
+worker is kept preloaded, so a recycled worker is swapped out without waiting
+for the next one to import build123d.
+"""
+import importlib
+import multiprocessing
+import os
+import time
+from multiprocessing.connection import Connection, wait
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from execution import IMPORTED_MARKER, ExampleResult, Limits, RunOptions, limit_address_space, rss_mb, run_source
+
+Task = Tuple[str, str]  # (source, name)
+
+
+def _worker_main(conn: Connection, max_address_space_mb: Optional[int], options: RunOptions) -> None:
+    """
+    Entry point of a worker process: preload build123d, then serve tasks until told to stop.
+    """
+    limit_address_space(max_address_space_mb)
+    importlib.import_module("build123d")  # Preload so examples only pay for the star import
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        source, name = task
+        conn.send(run_source(source, name, options=options, on_imported=lambda: conn.send(IMPORTED_MARKER)))
+
+
+class RecyclePolicy(NamedTuple):
+    """When a worker is replaced by a fresh one between tasks. None disables a criterion."""
+    max_tasks: Optional[int] = None  # Tasks a worker executes before it is replaced
+    max_rss_mb: Optional[float] = None  # Resident memory after a task above which the worker is replaced
+
+    def enabled(self) -> bool:
+        return self.max_tasks is not None or self.max_rss_mb is not None
+
+    def due(self, worker: "Worker") -> bool:
+        """
+        Returns whether an idle worker should be replaced.
+        """
+        if self.max_tasks is not None and worker.tasks_done >= self.max_tasks:
+            return True
+        return self.max_rss_mb is not None and rss_mb(worker.process.pid) >= self.max_rss_mb
+
+
+class Worker:
+    """A single worker process and the parent's end of its pipe."""
+
+    def __init__(self, limits: Limits, options: RunOptions) -> None:
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_worker_main, args=(child_conn, limits.max_address_space_mb, options), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.task_index: Optional[int] = None  # Index of the task in progress, if any
+        self.started = 0.0  # time.monotonic() when the task in progress was submitted
+        self.imported: Optional[float] = None  # time.monotonic() when its leading imports were done
+        self.tasks_done = 0
+
+    def submit(self, index: int, task: Task) -> None:
+        self.task_index = index
+        self.started = time.monotonic()
+        self.imported = None
+        self.conn.send(task)
+
+    def retire(self) -> None:
+        """
+        Asks the worker to exit after its current task without waiting for it.
+        """
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+
+    def stop(self) -> None:
+        self.retire()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class WorkerPool:
+    """
+    Pool of warm worker processes executing example sources.
+
+    Use as a context manager so the workers are shut down when done. A worker whose
+    example exceeds the limits is killed and replaced, and the example is reported
+    as a "timeout" or "oom" result. With a recycle policy, workers that are due are
+    replaced between tasks by a spare that has already preloaded build123d.
+    """
+
+    def __init__(
+        self,
+        processes: Optional[int] = None,
+        limits: Limits = Limits(),
+        options: RunOptions = RunOptions(),
+        recycle: RecyclePolicy = RecyclePolicy(),
+    ) -> None:
+        self.processes = processes or os.cpu_count() or 1
+        self.limits = limits
+        self.options = options
+        self.recycle = recycle
+        self.workers: List[Worker] = [Worker(limits, options) for _ in range(self.processes)]
+        self.spare: Optional[Worker] = Worker(limits, options) if recycle.enabled() else None
+        self.retired: List[Worker] = []  # Recycled workers that may still be exiting
+        self.recycled = 0
+
+    def __enter__(self) -> "WorkerPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for worker in self.workers + self.retired + ([self.spare] if self.spare is not None else []):
+            worker.stop()
+        self.workers = []
+        self.retired = []
+        self.spare = None
+
+    def _fresh_worker(self) -> Worker:
+        """
+        Returns the preloaded spare, if any, and starts the next spare in the background.
+        """
+        if self.spare is None:
+            return Worker(self.limits, self.options)
+        worker, self.spare = self.spare, Worker(self.limits, self.options)
+        return worker
+
+    def _replace(self, worker: Worker) -> None:
+        worker.stop()
+        self.workers[self.workers.index(worker)] = self._fresh_worker()
+
+    def _recycle(self, worker: Worker) -> None:
+        """
+        Swaps an idle worker for a fresh one without waiting for the old one to exit.
+        """
+        worker.retire()
+        for retired in self.retired:
+            if not retired.process.is_alive():
+                retired.stop()  # Already exited; this only releases its pipe
+        self.retired = [retired for retired in self.retired if retired.process.is_alive()] + [worker]
+        self.workers[self.workers.index(worker)] = self._fresh_worker()
+        self.recycled += 1
+
+    def imap_unordered(self, tasks: Iterable[Task]) -> Iterator[Tuple[int, ExampleResult]]:
+        """
+        Executes tasks on all workers, yielding (task index, result) as each one completes.
+
+        Args:
+            tasks (Iterable[Task]): (source, name) pairs to execute.
+        """
+        pending = list(enumerate(tasks))
+        pending.reverse()  # pop() from the end hands out tasks in input order
+        names: Dict[int, str] = {}
+        busy: Dict[Connection, Worker] = {}
+
+        while pending or busy:
+            for worker in self.workers:
+                if pending and worker.task_index is None:
+                    index, task = pending.pop()
+                    names[index] = task[1]
+                    worker.submit(index, task)
+                    busy[worker.conn] = worker
+
+            for conn in wait(list(busy), timeout=self.limits.poll_interval()):
+                worker = busy.pop(conn)
+                index = worker.task_index
+                try:
+                    result = conn.recv()
+                    if isinstance(result, str):
+                        # IMPORTED_MARKER: the timeout counts from here, like in the subprocess executor
+                        worker.imported = time.monotonic()
+                        busy[conn] = worker
+                        continue
+                    worker.task_index = None
+                    worker.tasks_done += 1
+                    if self.recycle.due(worker):
+                        self._recycle(worker)
+                except EOFError:
+                    # The worker died mid-task (e.g. a crash inside OCC); replace it
+                    worker.process.join()
+                    message = f"Worker exited with code {worker.process.exitcode}"
+                    status = self.limits.failure_status(message, worker.process.exitcode)
+                    wall_time = time.monotonic() - worker.started
+                    self._replace(worker)
+                    result = ExampleResult(
+                        names[index], status, message=message, wall_time=wall_time, exit_code=worker.process.exitcode
+                    )
+                yield index, result
+
+            for conn, worker in list(busy.items()):
+                status = self.limits.exceeded(
+                    worker.process.pid, worker.imported if worker.imported is not None else time.monotonic()
+                )
+                if status is not None:
+                    # A hung kernel call cannot be interrupted from inside, so kill the whole worker
+                    busy.pop(conn)
+                    index = worker.task_index
+                    worker.process.kill()
+                    wall_time = time.monotonic() - worker.started
+                    self._replace(worker)
+                    message = self.limits.exceeded_message(status)
+                    yield index, ExampleResult(
+                        names[index], status, message=message, wall_time=wall_time, exit_code=worker.process.exitcode
+                    )
+
+    def map(self, tasks: Iterable[Task]) -> List[ExampleResult]:
+        """
+        Executes tasks on all workers and returns the results in task order.
+        """
+        results: Dict[int, ExampleResult] = dict(self.imap_unordered(tasks))
+        return [results[index] for index in sorted(results)]